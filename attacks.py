@@ -0,0 +1,138 @@
+"""Attack tables for the pieces that jump rather than slide.
+
+Every table maps a location to the squares a piece standing there
+attacks, as a tuple of locations for walking and as a bitmask (bit
+x + 8 * y for square (x, y)) for testing against bitboards. They are
+built once at import, so move generation never has to check whether a
+square is on the board."""
+from color import Color
+
+KNIGHT_VECTORS = ((1, 2), (1, -2), (-1, 2), (-1, -2),
+        (2, 1), (2, -1), (-2, 1), (-2, -1))
+KING_VECTORS = ((1, 0), (1, 1), (0, 1), (-1, 1),
+        (-1, 0), (-1, -1), (0, -1), (1, -1))
+# indexed by color, like PAWN_ATTACKS
+PAWN_VECTORS = (((-1, 1), (1, 1)), ((-1, -1), (1, -1)))
+
+LOCATIONS = tuple((x, y) for y in xrange(8) for x in xrange(8))
+
+
+def _leaps(location, vectors):
+    x, y = location
+    return tuple((x + u, y + v) for u, v in vectors
+            if 0 <= x + u < 8 and 0 <= y + v < 8)
+
+
+def _mask(locations):
+    mask = 0
+    for x, y in locations:
+        mask |= 1 << (x + 8 * y)
+    return mask
+
+
+def _table(vectors):
+    return dict((location, _leaps(location, vectors))
+            for location in LOCATIONS)
+
+
+def _masks(table):
+    return dict((location, _mask(squares))
+            for location, squares in table.iteritems())
+
+
+KNIGHT_ATTACKS = _table(KNIGHT_VECTORS)
+KING_ATTACKS = _table(KING_VECTORS)
+PAWN_ATTACKS = [_table(PAWN_VECTORS[color])
+        for color in (Color.WHITE, Color.BLACK)]
+
+KNIGHT_MASKS = _masks(KNIGHT_ATTACKS)
+KING_MASKS = _masks(KING_ATTACKS)
+PAWN_MASKS = [_masks(PAWN_ATTACKS[color])
+        for color in (Color.WHITE, Color.BLACK)]
+
+LOCATION_BITS = dict(((x, y), 1 << (x + 8 * y)) for x, y in LOCATIONS)
+
+# Sliding pieces attack along lines, each line being a pair of opposite
+# rays. For every location and line the squares that can block the
+# line are masked out of the board's occupancy, and the result indexes
+# a table of what the piece attacks through that arrangement of
+# blockers. This is the idea behind magic bitboards, with a dict
+# standing in for the magic multiply-and-shift perfect hash.
+RANK, FILE, DIAGONAL, ANTIDIAGONAL = \
+        ((1, 0), (-1, 0)), ((0, 1), (0, -1)), \
+        ((1, 1), (-1, -1)), ((1, -1), (-1, 1))
+
+
+def _ray(location, vector):
+    x, y = location
+    u, v = vector
+    squares = []
+    while 0 <= x + u < 8 and 0 <= y + v < 8:
+        x, y = x + u, y + v
+        squares.append((x, y))
+    return squares
+
+
+def _subsets(mask):
+    """Generate every mask made of a subset of the bits of mask."""
+    subset = 0
+    while True:
+        yield subset
+        subset = (subset - mask) & mask
+        if not subset:
+            break
+
+
+def _line_table(location, line):
+    """Build the (mask, table) pair for a location and line.
+    The table maps each arrangement of blockers to a tuple of the
+    squares attacked that are certainly empty, a tuple of the squares
+    at the ends of the rays that may hold a piece of either color, and
+    the mask of all the attacked squares."""
+    rays = [_ray(location, vector) for vector in line]
+    # the last square of a ray is attacked whether or not it is empty
+    mask = _mask(square for ray in rays for square in ray[:-1])
+    table = {}
+    for occupied in _subsets(mask):
+        empty, ends = [], []
+        for ray in rays:
+            for square in ray:
+                if occupied & LOCATION_BITS[square] or square == ray[-1]:
+                    ends.append(square)
+                    break
+                empty.append(square)
+        table[occupied] = (tuple(empty), tuple(ends), _mask(empty + ends))
+    return mask, table
+
+
+def _slider_tables(lines):
+    return dict((location,
+            tuple(_line_table(location, line) for line in lines))
+            for location in LOCATIONS)
+
+
+BISHOP_LINES = _slider_tables((DIAGONAL, ANTIDIAGONAL))
+ROOK_LINES = _slider_tables((RANK, FILE))
+QUEEN_LINES = dict((location, ROOK_LINES[location] + BISHOP_LINES[location])
+        for location in LOCATIONS)
+
+
+def slider_mask(lines, location, occupied):
+    """Get the mask of squares a slider attacks given the occupied squares.
+    lines is one of BISHOP_LINES, ROOK_LINES or QUEEN_LINES."""
+    attacks = 0
+    for mask, table in lines[location]:
+        attacks |= table[occupied & mask][2]
+    return attacks
+
+
+def _rays(lines):
+    return dict((location, tuple(tuple(_ray(location, vector))
+            for line in lines for vector in line if _ray(location, vector)))
+            for location in LOCATIONS)
+
+
+# The single rays out from each location, nearest square first, for
+# looking along a line past its first blocker (pins and x-rays).
+ROOK_RAYS = _rays((RANK, FILE))
+BISHOP_RAYS = _rays((DIAGONAL, ANTIDIAGONAL))
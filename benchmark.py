@@ -0,0 +1,212 @@
+"""Perft benchmarks of move generation.
+
+Run on its own, this times perft over the standard test positions,
+checks the node counts against the published ones, and reports
+nodes/sec and peak memory. Results can be written out as JSON and
+compared with those of an earlier run, failing if throughput drops
+by more than a threshold:
+
+    python benchmark.py --json baseline.json
+    python benchmark.py --baseline baseline.json --threshold 10
+
+--micro adds timings of the board backends and piece internals."""
+import argparse
+import json
+import resource
+import sys
+import time
+
+from bitboard import BitBoard
+from board import Board
+from game import new_game
+from piece import VectorPiece
+from transposition import PerftTable
+
+KIWIPETE = "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"
+
+# name, FEN, node counts from depth 1 up and the depth run by default
+POSITIONS = (
+    ("initial", "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+        (20, 400, 8902, 197281, 4865609), 3),
+    ("kiwipete", KIWIPETE,
+        (48, 2039, 97862, 4085603), 3),
+    ("position3", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+        (14, 191, 2812, 43238, 674624), 4),
+    ("position4",
+        "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+        (6, 264, 9467, 422333), 3),
+    ("position5", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+        (44, 1486, 62379, 2103487), 3),
+    ("position6", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/"
+        "1PP1QPPP/R4RK1 w - - 0 10",
+        (46, 2079, 89890, 3894594), 3),
+)
+
+BACKENDS = {"board": Board, "bitboard": BitBoard}
+
+
+def time_perft(game, depth, table=None):
+    """Run perft on the game and return the node count and nodes/sec."""
+    start = time.time()
+    nodes = game.perft(depth, table)
+    elapsed = time.time() - start
+    # a run too short for the clock to see is reported at 0 nodes/sec
+    return nodes, nodes / elapsed if elapsed else 0.0
+
+
+def peak_memory():
+    """Get the most memory this process has held so far, in kilobytes."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def run_suite(backend=Board, depth=None, names=None, table_size=0):
+    """Time perft over the standard positions.
+    depth overrides the default depth of each position, up to the
+    deepest known count. Returns a list of results, one dict for each
+    position."""
+    results = []
+    for name, fen, counts, default in POSITIONS:
+        if names and name not in names:
+            continue
+        run = min(depth or default, len(counts))
+        table = PerftTable(table_size) if table_size else None
+        nodes, rate = time_perft(new_game(backend(), fen), run, table)
+        results.append({"name": name, "depth": run, "nodes": nodes,
+            "expected": counts[run - 1], "nodes_per_sec": rate})
+    return results
+
+
+def regressions(results, baseline, threshold):
+    """List the names of the positions searched more than threshold
+    percent slower than in the baseline results at the same depth.
+    Runs too short to be timed are not compared."""
+    before = dict((result["name"], result) for result in baseline)
+    slower = []
+    for result in results:
+        old = before.get(result["name"])
+        if old is None or old["depth"] != result["depth"] or \
+                not result["nodes_per_sec"]:
+            continue
+        if result["nodes_per_sec"] < \
+                old["nodes_per_sec"] * (1 - threshold / 100.0):
+            slower.append(result["name"])
+    return slower
+
+
+def time_sliders(game, repeat=1000):
+    """Time the slider attack lookup against walking the rays.
+
+    Returns the seconds taken by each for every slider on the board.
+    """
+    sliders = [p for p in game.board.pieces if isinstance(p, VectorPiece)]
+    times = []
+    for method in (VectorPiece.attackable, VectorPiece._walk):
+        start = time.time()
+        for _ in xrange(repeat):
+            for piece in sliders:
+                for _ in method(piece, game.board):
+                    pass
+        times.append(time.time() - start)
+    return times
+
+
+def piece_footprint(game):
+    """Get the average bytes taken by each piece on the board, counting
+    the instance dict of pieces that have one."""
+    total = 0
+    pieces = game.board.pieces
+    for piece in pieces:
+        total += sys.getsizeof(piece)
+        if hasattr(piece, "__dict__"):
+            total += sys.getsizeof(piece.__dict__)
+    return total / len(pieces)
+
+
+def time_attributes(game, repeat=10000):
+    """Time reading the attributes move generation and hashing use of
+    every piece on the board."""
+    pieces = game.board.pieces
+    start = time.time()
+    for _ in xrange(repeat):
+        for piece in pieces:
+            piece.location, piece.color, hash(piece)
+    return time.time() - start
+
+
+def micro():
+    """Print timings of the board backends and of piece internals."""
+    for backend in (Board, BitBoard):
+        nodes, rate = time_perft(new_game(backend(), KIWIPETE), 2)
+        print "%-8s perft(2) = %d  %.0f nodes/sec" \
+                % (backend.__name__, nodes, rate)
+        lookup, walk = time_sliders(new_game(backend(), KIWIPETE))
+        print "%-8s slider attacks: lookup %.3fs  rays %.3fs" \
+                % (backend.__name__, lookup, walk)
+    game = new_game(Board(), KIWIPETE)
+    print "pieces: %d bytes each, attribute reads %.3fs" \
+            % (piece_footprint(game), time_attributes(game))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run perft benchmarks.")
+    parser.add_argument("--depth", type=int,
+            help="depth for every position instead of its default")
+    parser.add_argument("--backend", choices=sorted(BACKENDS),
+            default="bitboard")
+    parser.add_argument("--position", action="append", dest="names",
+            choices=[name for name, _, _, _ in POSITIONS],
+            help="run only the named position (may be repeated)")
+    parser.add_argument("--table", type=int, default=0, metavar="MB",
+            help="size of a perft hash table, none by default")
+    parser.add_argument("--json", metavar="FILE",
+            help="write the results to FILE")
+    parser.add_argument("--baseline", metavar="FILE",
+            help="results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=10.0,
+            help="percent drop in nodes/sec that counts as a regression")
+    parser.add_argument("--micro", action="store_true",
+            help="also time the backends and piece internals")
+    args = parser.parse_args(argv)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("backend", args.backend) != args.backend:
+            parser.error("the baseline was run on the %s backend, not %s"
+                    % (baseline["backend"], args.backend))
+
+    results = run_suite(BACKENDS[args.backend], args.depth, args.names,
+            args.table)
+    failed = False
+    for result in results:
+        status = "ok" if result["nodes"] == result["expected"] else "WRONG"
+        failed = failed or status != "ok"
+        print "%-10s perft(%d) = %9d  %8.0f nodes/sec  %s" % (result["name"],
+                result["depth"], result["nodes"], result["nodes_per_sec"],
+                status)
+    nodes = sum(result["nodes"] for result in results)
+    seconds = sum(result["nodes"] / result["nodes_per_sec"]
+            for result in results if result["nodes_per_sec"])
+    summary = {"backend": args.backend, "nodes": nodes,
+            "nodes_per_sec": nodes / seconds if seconds else 0.0,
+            "peak_memory_kb": peak_memory(),
+            "positions": results}
+    print "total %d nodes  %.0f nodes/sec  peak memory %d kB" \
+            % (nodes, summary["nodes_per_sec"], summary["peak_memory_kb"])
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2, sort_keys=True)
+    if baseline is not None:
+        slower = regressions(results, baseline["positions"], args.threshold)
+        for name in slower:
+            print "%s is more than %g%% slower than the baseline" \
+                    % (name, args.threshold)
+        failed = failed or bool(slower)
+    if args.micro:
+        micro()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+from attacks import KNIGHT_MASKS, KING_MASKS, PAWN_MASKS, \
+        BISHOP_LINES, ROOK_LINES, slider_mask
+from board import Board
+from piece import PIECE_TYPES, Pawn, Knight, Bishop, Rook, Queen, King
+from zobrist import piece_key
+
+
+def square_index(location):
+    """Convert an x-y coordinate into a square index from 0 (a1) to 63 (h8)."""
+    x, y = location
+    return x + 8 * y
+
+
+SQUARE_BITS = [1 << i for i in xrange(64)]
+ON_BOARD = frozenset((x, y) for x in xrange(8) for y in xrange(8))
+TYPE_INDEX = dict((piece_type, i) for i, piece_type in enumerate(PIECE_TYPES))
+
+
+class BitBoard(Board):
+    """A board backed by one 64-bit mask per piece type and color.
+
+    Bit i of a mask is set when square i (see square_index) is occupied.
+    A mailbox of piece objects keyed by location is kept next to the
+    masks so that piece_at can still hand back the pieces themselves.
+    The location queries are bound straight to the C methods of the
+    mailbox and square set, which saves a Python call on every lookup."""
+    # a bitboard has no square off the board to hold a piece, so the
+    # legal move generator never has strays to fall back for
+    _strays = frozenset()
+
+    def __init__(self, pieces=None):
+        self._bitboards = [0] * (2 * len(PIECE_TYPES))
+        self._occupied = [0, 0]
+        self._squares = dict.fromkeys(ON_BOARD)
+        self.piece_at = self._squares.get
+        self.is_on_board = ON_BOARD.__contains__
+        self.hash = 0
+        self.mg_score = self.eg_score = self.phase = 0
+        for piece in (pieces or {}).values():
+            self._place(piece)
+
+    @property
+    def pieces(self):
+        return [piece for piece in self._squares.itervalues()
+                if piece is not None]
+
+    @property
+    def _pieces(self):
+        return dict((piece.location, piece) for piece in self.pieces)
+
+    def bitboard(self, piece_type, color):
+        """Mask of the squares holding pieces of the given type and color."""
+        return self._bitboards[TYPE_INDEX[piece_type] * 2 + color]
+
+    def is_attacked(self, square, by_color):
+        """Check if any piece of the given color attacks the square.
+        Intersects the attack masks of each piece type, seen from the
+        square, with the masks of the attacking pieces."""
+        if square not in ON_BOARD:
+            return False
+        boards = self._bitboards
+        if KNIGHT_MASKS[square] & boards[TYPE_INDEX[Knight] * 2 + by_color]:
+            return True
+        if KING_MASKS[square] & boards[TYPE_INDEX[King] * 2 + by_color]:
+            return True
+        if PAWN_MASKS[1 - by_color][square] & \
+                boards[TYPE_INDEX[Pawn] * 2 + by_color]:
+            return True
+        queens = boards[TYPE_INDEX[Queen] * 2 + by_color]
+        occupied = self.occupied
+        rooks = boards[TYPE_INDEX[Rook] * 2 + by_color] | queens
+        if rooks and slider_mask(ROOK_LINES, square, occupied) & rooks:
+            return True
+        bishops = boards[TYPE_INDEX[Bishop] * 2 + by_color] | queens
+        return bool(bishops and
+                slider_mask(BISHOP_LINES, square, occupied) & bishops)
+
+    def _place(self, piece):
+        location = piece.location
+        assert location in ON_BOARD and self._squares[location] is None
+        bit = SQUARE_BITS[square_index(location)]
+        color = piece.color
+        self._bitboards[TYPE_INDEX[type(piece)] * 2 + color] |= bit
+        self._occupied[color] |= bit
+        self._squares[location] = piece
+        self.hash ^= piece_key(piece)
+        self._add_values(piece)
+
+    def _lift(self, piece):
+        location = piece.location
+        assert self._squares[location] is piece
+        bit = SQUARE_BITS[square_index(location)]
+        color = piece.color
+        self._bitboards[TYPE_INDEX[type(piece)] * 2 + color] ^= bit
+        self._occupied[color] ^= bit
+        self._squares[location] = None
+        self.hash ^= piece_key(piece)
+        self._remove_values(piece)
+
+    def add_piece(self, piece):
+        """Add a piece to the board."""
+        self._place(piece)
+        piece.owner.pieces.add(piece)
+        if type(piece) == King:
+            piece.owner.king = piece
+
+    def move_piece(self, piece, loc):
+        """Move a piece to the specified square."""
+        owner = piece.owner
+        owner.pieces.remove(piece)
+        self._lift(piece)
+        piece._location = loc
+        self._place(piece)
+        owner.pieces.add(piece)
+
+    def remove_piece(self, piece):
+        """Remove a piece from the board."""
+        self._lift(piece)
+        piece.owner.pieces.remove(piece)
+        if piece.owner.king is piece:
+            piece.owner.king = None
+
+    def __eq__(self, other):
+        if self.hash != other.hash:
+            return False
+        if isinstance(other, BitBoard):
+            return self._bitboards == other._bitboards
+        return self._pieces == other._pieces
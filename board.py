@@ -1,10 +1,26 @@
+from attacks import KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS, \
+        LOCATION_BITS, BISHOP_LINES, ROOK_LINES, BISHOP_RAYS, ROOK_RAYS
 from color import Color
+from evaluation import piece_values
+from piece import Pawn, Knight, Bishop, Rook, Queen, King
+from zobrist import piece_key
 
 
 class Board(object):
     def __init__(self, pieces=None):
         self._pieces = pieces or {}
         assert type(self._pieces) == dict
+        self.hash = 0
+        # running evaluation terms, see evaluation.py
+        self.mg_score = self.eg_score = self.phase = 0
+        # squares occupied by each color, bit x + 8 * y for (x, y)
+        self._occupied = [0, 0]
+        # pieces placed off the 8x8 board, which the tables can't see
+        self._strays = set()
+        for piece in self._pieces.values():
+            self.hash ^= piece_key(piece)
+            self._add_values(piece)
+            self._occupy(piece)
 
     @property
     def width(self):
@@ -18,6 +34,15 @@ class Board(object):
     def pieces(self):
         return self._pieces.values()
 
+    @property
+    def occupied(self):
+        """Mask of all occupied squares."""
+        return self._occupied[Color.WHITE] | self._occupied[Color.BLACK]
+
+    def occupancy(self, color):
+        """Mask of the squares occupied by the given color."""
+        return self._occupied[color]
+
     LOCS = {}
 
     def is_on_board(self, loc):
@@ -34,11 +59,110 @@ class Board(object):
         """Get the piece at a given location or None if no piece is found."""
         return self._pieces.get(location, None)
 
+    def _add_values(self, piece):
+        mg, eg, phase = piece_values(piece)
+        self.mg_score += mg
+        self.eg_score += eg
+        self.phase += phase
+
+    def _remove_values(self, piece):
+        mg, eg, phase = piece_values(piece)
+        self.mg_score -= mg
+        self.eg_score -= eg
+        self.phase -= phase
+
+    def _occupy(self, piece):
+        bit = LOCATION_BITS.get(piece._location)
+        if bit is None:
+            self._strays.add(piece)
+        else:
+            self._occupied[piece.color] |= bit
+
+    def _vacate(self, piece):
+        bit = LOCATION_BITS.get(piece._location)
+        if bit is None:
+            self._strays.discard(piece)
+        else:
+            self._occupied[piece.color] &= ~bit
+
+    def is_attacked(self, square, by_color):
+        """Check if any piece of the given color attacks the square.
+        Looks outward from the square along the lines a knight, king,
+        pawn or slider would attack it from, stopping at the first hit."""
+        if square not in LOCATION_BITS:
+            return any(piece.color == by_color and
+                    piece.can_attack(self, square) for piece in self.pieces)
+        piece_at = self.piece_at
+        for origins, types in ((KNIGHT_ATTACKS, (Knight,)),
+                (KING_ATTACKS, (King,)),
+                (PAWN_ATTACKS[1 - by_color], (Pawn,))):
+            for origin in origins[square]:
+                piece = piece_at(origin)
+                if piece is not None and type(piece) in types and \
+                        piece.color == by_color:
+                    return True
+        occupied = self.occupied
+        for lines, types in ((ROOK_LINES, (Rook, Queen)),
+                (BISHOP_LINES, (Bishop, Queen))):
+            for mask, table in lines[square]:
+                for origin in table[occupied & mask][1]:
+                    piece = piece_at(origin)
+                    if piece is not None and type(piece) in types and \
+                            piece.color == by_color:
+                        return True
+        return any(piece.color == by_color and
+                piece.can_attack(self, square) for piece in self._strays)
+
+    def pins_and_checks(self, square, color):
+        """Find what pins and checks a king of the given color on square.
+        Returns a list with one entry per checking piece, the set of
+        squares where a piece could capture or block it, and a dict
+        mapping the location of each pinned piece to the squares along
+        its pin it may still move to. Pieces off the 8x8 board are not
+        seen."""
+        piece_at = self.piece_at
+        checks = []
+        pins = {}
+        for rays, types in ((ROOK_RAYS, (Rook, Queen)),
+                (BISHOP_RAYS, (Bishop, Queen))):
+            for ray in rays[square]:
+                pinned = None
+                for i, location in enumerate(ray):
+                    piece = piece_at(location)
+                    if piece is None:
+                        continue
+                    if piece.color == color:
+                        if pinned is not None:
+                            break
+                        pinned = location
+                        continue
+                    if type(piece) in types:
+                        line = frozenset(ray[:i + 1])
+                        if pinned is None:
+                            checks.append(line)
+                        else:
+                            pins[pinned] = line
+                    break
+        for origins, types in ((KNIGHT_ATTACKS, (Knight,)),
+                (PAWN_ATTACKS[color], (Pawn,))):
+            for origin in origins[square]:
+                piece = piece_at(origin)
+                if piece is not None and type(piece) in types and \
+                        piece.color != color:
+                    checks.append(frozenset((origin,)))
+        return checks, pins
+
     def add_piece(self, piece):
         """Add a piece to the board."""
-        assert self.piece_at(piece.location) is None
-        self._pieces[piece.location] = piece
+        location = piece._location
+        assert location not in self._pieces
+        self._pieces[location] = piece
         piece.owner.pieces.add(piece)
+        if type(piece) == King:
+            piece.owner.king = piece
+        self.hash ^= piece_key(piece)
+        self._add_values(piece)
+        self._occupy(piece)
 
     def move_piece(self, piece, loc):
         """Move a piece to the specified square."""
@@ -48,12 +172,18 @@ class Board(object):
 
     def remove_piece(self, piece):
         """Remove a piece from the board."""
-        assert self.piece_at(piece.location) == piece
+        location = piece._location
+        assert self._pieces.get(location) == piece
         piece.owner.pieces.remove(piece)
-        del self._pieces[piece.location]
+        if piece.owner.king is piece:
+            piece.owner.king = None
+        del self._pieces[location]
+        self.hash ^= piece_key(piece)
+        self._remove_values(piece)
+        self._vacate(piece)
 
     def __eq__(self, other):
-        return self._pieces == other._pieces
+        return self.hash == other.hash and self._pieces == other._pieces
 
     def __ne__(self, other):
         return not (self == other)
@@ -66,7 +196,7 @@ class Board(object):
             piece_str = str(piece)[0]
             if str(piece) == "Knight":
                 piece_str = "N"
-            if piece.owner.color == Color.BLACK:
+            if piece.color == Color.BLACK:
                 piece_str = piece_str.lower()
             a[7 - piece.location[1]][piece.location[0]] = piece_str
         for row in a:
@@ -0,0 +1,152 @@
+"""Material and piece-square evaluation, tapered between game phases.
+
+Every piece contributes a middlegame and an endgame value depending on
+its type and square, positive for white and negative for black. The
+boards keep running totals of these, and of the game phase, as pieces
+come and go, so a position can be scored without looking at its
+pieces. The phase runs from PHASE_MAX with all minor and major pieces
+on the board down to 0 with none left, and weights the middlegame total
+against the endgame total."""
+from color import Color
+from piece import Pawn, Knight, Bishop, Rook, Queen, King
+
+# middlegame and endgame values in centipawns
+VALUES = {
+        Pawn: (100, 120),
+        Knight: (320, 300),
+        Bishop: (330, 320),
+        Rook: (500, 520),
+        Queen: (900, 920),
+        King: (0, 0),
+        }
+
+PHASE = {Pawn: 0, Knight: 1, Bishop: 1, Rook: 2, Queen: 4, King: 0}
+PHASE_MAX = 24
+
+# Piece-square bonuses for white, laid out as seen from white's side
+# of the board (a8 top left, h1 bottom right). Black uses the mirror
+# image. Tables without a separate endgame version are used for both.
+_PAWN = (
+          0,   0,   0,   0,   0,   0,   0,   0,
+         50,  50,  50,  50,  50,  50,  50,  50,
+         10,  10,  20,  30,  30,  20,  10,  10,
+          5,   5,  10,  25,  25,  10,   5,   5,
+          0,   0,   0,  20,  20,   0,   0,   0,
+          5,  -5, -10,   0,   0, -10,  -5,   5,
+          5,  10,  10, -20, -20,  10,  10,   5,
+          0,   0,   0,   0,   0,   0,   0,   0)
+
+_KNIGHT = (
+        -50, -40, -30, -30, -30, -30, -40, -50,
+        -40, -20,   0,   0,   0,   0, -20, -40,
+        -30,   0,  10,  15,  15,  10,   0, -30,
+        -30,   5,  15,  20,  20,  15,   5, -30,
+        -30,   0,  15,  20,  20,  15,   0, -30,
+        -30,   5,  10,  15,  15,  10,   5, -30,
+        -40, -20,   0,   5,   5,   0, -20, -40,
+        -50, -40, -30, -30, -30, -30, -40, -50)
+
+_BISHOP = (
+        -20, -10, -10, -10, -10, -10, -10, -20,
+        -10,   0,   0,   0,   0,   0,   0, -10,
+        -10,   0,   5,  10,  10,   5,   0, -10,
+        -10,   5,   5,  10,  10,   5,   5, -10,
+        -10,   0,  10,  10,  10,  10,   0, -10,
+        -10,  10,  10,  10,  10,  10,  10, -10,
+        -10,   5,   0,   0,   0,   0,   5, -10,
+        -20, -10, -10, -10, -10, -10, -10, -20)
+
+_ROOK = (
+          0,   0,   0,   0,   0,   0,   0,   0,
+          5,  10,  10,  10,  10,  10,  10,   5,
+         -5,   0,   0,   0,   0,   0,   0,  -5,
+         -5,   0,   0,   0,   0,   0,   0,  -5,
+         -5,   0,   0,   0,   0,   0,   0,  -5,
+         -5,   0,   0,   0,   0,   0,   0,  -5,
+         -5,   0,   0,   0,   0,   0,   0,  -5,
+          0,   0,   0,   5,   5,   0,   0,   0)
+
+_QUEEN = (
+        -20, -10, -10,  -5,  -5, -10, -10, -20,
+        -10,   0,   0,   0,   0,   0,   0, -10,
+        -10,   0,   5,   5,   5,   5,   0, -10,
+         -5,   0,   5,   5,   5,   5,   0,  -5,
+          0,   0,   5,   5,   5,   5,   0,  -5,
+        -10,   5,   5,   5,   5,   5,   0, -10,
+        -10,   0,   5,   0,   0,   0,   0, -10,
+        -20, -10, -10,  -5,  -5, -10, -10, -20)
+
+_KING_MIDDLEGAME = (
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -20, -30, -30, -40, -40, -30, -30, -20,
+        -10, -20, -20, -20, -20, -20, -20, -10,
+         20,  20,   0,   0,   0,   0,  20,  20,
+         20,  30,  10,   0,   0,  10,  30,  20)
+
+_KING_ENDGAME = (
+        -50, -40, -30, -20, -20, -30, -40, -50,
+        -30, -20, -10,   0,   0, -10, -20, -30,
+        -30, -10,  20,  30,  30,  20, -10, -30,
+        -30, -10,  30,  40,  40,  30, -10, -30,
+        -30, -10,  30,  40,  40,  30, -10, -30,
+        -30, -10,  20,  30,  30,  20, -10, -30,
+        -30, -30,   0,   0,   0,   0, -30, -30,
+        -50, -30, -30, -30, -30, -30, -30, -50)
+
+_TABLES = {
+        Pawn: (_PAWN, _PAWN),
+        Knight: (_KNIGHT, _KNIGHT),
+        Bishop: (_BISHOP, _BISHOP),
+        Rook: (_ROOK, _ROOK),
+        Queen: (_QUEEN, _QUEEN),
+        King: (_KING_MIDDLEGAME, _KING_ENDGAME),
+        }
+
+
+def _square_values(piece_type, color):
+    """Map every square to a piece's signed (middlegame, endgame, phase)."""
+    (mg_value, eg_value), phase = VALUES[piece_type], PHASE[piece_type]
+    mg_table, eg_table = _TABLES[piece_type]
+    sign = 1 if color == Color.WHITE else -1
+    values = {}
+    for x in xrange(8):
+        for y in xrange(8):
+            # row 0 of a table is white's eighth rank
+            row = 7 - y if color == Color.WHITE else y
+            values[x, y] = (sign * (mg_value + mg_table[8 * row + x]),
+                    sign * (eg_value + eg_table[8 * row + x]), phase)
+    return values
+
+
+SQUARE_VALUES = dict((piece_type, [_square_values(piece_type, color)
+        for color in (Color.WHITE, Color.BLACK)]) for piece_type in VALUES)
+
+_OFF_BOARD = (0, 0, 0)
+
+
+def piece_values(piece):
+    """Get the (middlegame, endgame, phase) terms of a piece on its square."""
+    return SQUARE_VALUES[type(piece)][piece.color].get(
+            piece._location, _OFF_BOARD)
+
+
+def evaluate(pieces):
+    """Total the (middlegame, endgame, phase) terms of the given pieces.
+    The boards keep these totals up to date themselves; this is for
+    checking them."""
+    mg = eg = phase = 0
+    for piece in pieces:
+        piece_mg, piece_eg, piece_phase = piece_values(piece)
+        mg += piece_mg
+        eg += piece_eg
+        phase += piece_phase
+    return mg, eg, phase
+
+
+def tapered(mg, eg, phase):
+    """Blend middlegame and endgame scores by the phase of the game."""
+    phase = min(phase, PHASE_MAX)
+    return (mg * phase + eg * (PHASE_MAX - phase)) // PHASE_MAX
@@ -1,7 +1,43 @@
+import re
+from collections import namedtuple
+
 from board import Board
 from piece import Pawn, Bishop, Knight, Rook, Queen, King
 from player import Player, Color
 from position import Position
+from zobrist import castling_key, EN_PASSANT_KEYS, SIDE_KEY
+
+
+class State(namedtuple('State', 'move captured castling en_passant '
+        'halfmove_clock promoted rook rook_start')):
+    """What a move can't undo by itself, recorded as it is made.
+    castling holds the players whose castling rights the move changed,
+    en_passant and halfmove_clock are their values before the move,
+    promoted is the piece a pawn became and rook the rook moved by
+    castling from rook_start."""
+    __slots__ = ()
+
+
+FEN_PIECES = {"p": Pawn, "n": Knight, "b": Bishop, "r": Rook, "q": Queen,
+        "k": King}
+FEN_LETTERS = dict((piece_type, letter)
+        for letter, piece_type in FEN_PIECES.items())
+# castling rights in FEN, in the order they are written
+FEN_CASTLING = re.compile(r"^(-|K?Q?k?q?)$")
+# EPD operations whose operand is written as a quoted string
+STRING_OPCODES = frozenset(["id"] + ["c%d" % i for i in xrange(10)])
+# an EPD operation, which may be empty: its opcode and operands, where
+# a quoted operand may hold spaces and semicolons, up to the semicolon
+# that ends it
+EPD_OPERATION = re.compile(
+        r'\s*(?:([^\s;"]+)((?:\s+(?:"[^"]*"|[^\s;"]+))*))?\s*(?:;|$)')
+
+
+class PerftStats(namedtuple('PerftStats', 'nodes captures en_passant '
+        'castles promotions checks checkmates')):
+    """The columns of a perft results table, counting the positions
+    reached and the kinds of move that reached them."""
+    __slots__ = ()
 
 
 class Game(object):
@@ -11,90 +47,156 @@ class Game(object):
         self.board = board
         self.players = players
         self.ply = 0
+        # the pawn that may be taken en passant, if any
+        self.en_passant = None
+        # plies since the last capture or pawn move
+        self.halfmove_clock = 0
+        # what each move made can't undo by itself, see State
+        self.states = []
 
     @property
     def current_player(self):
         """The player whose turn it is."""
         return self.players[self.ply % 2]
 
+    @property
+    def hash(self):
+        """The 64-bit Zobrist key of the current position.
+        The board keeps the key of its pieces up to date as they move,
+        so only the castling, en passant and side to move terms are
+        added here."""
+        key = self.board.hash
+        for player in self.players:
+            key ^= castling_key(player)
+        if self.en_passant is not None:
+            key ^= EN_PASSANT_KEYS[self.en_passant.x]
+        if self.ply % 2:
+            key ^= SIDE_KEY
+        return key
+
     def _make_move(self, move):
         """Apply the given move to the board."""
+        board = self.board
+        piece, start, to, captured = \
+                move.piece, move.start, move.to, move.captured
+        owner = piece.owner
+
+        # a king move gives up both castling rights, a rook move from
+        # its corner the right on that side, as does losing that rook
+        changed = ()
+        if type(piece) == King:
+            if owner.castling[-1] != (False, False):
+                owner.castling.append((False, False))
+                changed = (owner,)
+        elif self._is_corner_rook(piece, start):
+            if self._lose_castling(owner, start):
+                changed = (owner,)
+        if self._is_corner_rook(captured, to):
+            if self._lose_castling(captured.owner, to):
+                changed += (captured.owner,)
+
         #Handle castling
-        if type(move.piece) == King:
-            dy = move.to[0] - move.start[0]
-            if abs(dy) == 2:
-                if dy == 2:
-                    rook = self.board.piece_at((7, move.to[1]))
-                    assert rook is not None, (move.piece, self.board._pieces)
-                    self.board.move_piece(rook, (5, move.to[1]))
-                else:
-                    rook = self.board.piece_at((0, move.to[1]))
-                    assert rook is not None, (move.piece, self.board._pieces)
-                    self.board.move_piece(rook, (3, move.to[1]))
-            move.piece.owner.castling.append((False, False))
-        #Remove castling rights on rook moves
-        elif type(move.piece) == Rook:
-            if move.start[0] == 0:
-                move.piece.owner.castling.append(
-                        (False, move.piece.owner.castling[-1][1]))
-            elif move.start[0] == 7:
-                move.piece.owner.castling.append(
-                        (move.piece.owner.castling[-1][0], False))
+        rook = rook_start = None
+        if type(piece) == King and abs(to[0] - start[0]) == 2:
+            if to[0] > start[0]:
+                rook_start, rook_to = (7, to[1]), (5, to[1])
             else:
-                move.piece.owner.castling.append(move.piece.owner.castling[-1])
-        #Otherwise repeat the last set of castling rights
-        else:
-            move.piece.owner.castling.append(move.piece.owner.castling[-1])
+                rook_start, rook_to = (0, to[1]), (3, to[1])
+            rook = board.piece_at(rook_start)
+            assert rook is not None, (piece, board._pieces)
+            board.move_piece(rook, rook_to)
 
         # handle en-passant
-        if type(move.piece) == Pawn:
-            pawn = move.piece
-            pawn.just_moved = (pawn.y == pawn.start_rank)
+        # only a pawn that has just advanced two squares can be taken,
+        # and only on the very next ply
+        en_passant = self.en_passant
+        if en_passant is not None:
+            en_passant.just_moved = False
+        if type(piece) == Pawn and abs(to[1] - start[1]) == 2:
+            piece.just_moved = True
+            self.en_passant = piece
+        else:
+            self.en_passant = None
 
-        if move.captured is not None:
-            self.board.remove_piece(move.captured)
+        halfmove_clock = self.halfmove_clock
+        if captured is not None or type(piece) == Pawn:
+            self.halfmove_clock = 0
+        else:
+            self.halfmove_clock += 1
+
+        if captured is not None:
+            board.remove_piece(captured)
 
-        self.board.move_piece(move.piece, move.to)
+        board.move_piece(piece, to)
 
+        promoted = None
         if move.promotion is not None:
-            promoted = move.promotion(move.piece.owner, move.piece.location)
-            self.board.remove_piece(move.piece)
-            self.board.add_piece(promoted)
+            promoted = move.promotion(owner, to)
+            board.remove_piece(piece)
+            board.add_piece(promoted)
 
+        self.states.append(State(move, captured, changed, en_passant,
+                halfmove_clock, promoted, rook, rook_start))
         self.moves.append(move)
         self.ply += 1
 
+    @staticmethod
+    def _is_corner_rook(piece, square):
+        """Check if piece is a rook on a corner of its own back rank."""
+        return type(piece) == Rook and square[0] in (0, 7) and \
+                square[1] == (0 if piece.color == Color.WHITE else 7)
+
+    @staticmethod
+    def _lose_castling(player, corner):
+        """Take away the player's right to castle towards a corner.
+        Returns whether the player had that right."""
+        queenside, kingside = player.castling[-1]
+        if corner[0] == 0 and queenside:
+            player.castling.append((False, kingside))
+        elif corner[0] == 7 and kingside:
+            player.castling.append((queenside, False))
+        else:
+            return False
+        return True
+
     def _undo_move(self):
-        """Apply the move in reverse to the board."""
-        # restore castling rights
+        """Apply the move in reverse to the board.
+        Everything a move can't reverse by itself is read back from the
+        state recorded when it was made."""
+        board = self.board
+        state = self.states.pop()
+        self.moves.pop()
         self.ply -= 1
-        move = self.moves.pop()
+        move = state.move
 
-        move.piece.owner.castling.pop()
+        # restore castling rights
+        for player in state.castling:
+            player.castling.pop()
+
+        # restore en passant state
+        if self.en_passant is not None:
+            self.en_passant.just_moved = False
+        self.en_passant = state.en_passant
+        if state.en_passant is not None:
+            state.en_passant.just_moved = True
+
+        self.halfmove_clock = state.halfmove_clock
 
         # if move was a castle, restore rook position
-        if type(move.piece) == King:
-            dy = move.to[0] - move.start[0]
-            if dy == 2:
-                rook = self.board.piece_at((5, move.to[1]))
-                self.board.move_piece(rook, (7, move.to[1]))
-            elif dy == -2:
-                rook = self.board.piece_at((3, move.to[1]))
-                self.board.move_piece(rook, (0, move.to[1]))
-
-        # remove promoted piece
-        # restore promoting pawn
-        if move.promotion is not None:
-            promoted = move.promotion(move.piece.owner, move.to)
-            self.board.remove_piece(promoted)
-            self.board.add_piece(move.piece)
+        if state.rook is not None:
+            board.move_piece(state.rook, state.rook_start)
+
+        # swap the promoted piece back for the pawn
+        if state.promoted is not None:
+            board.remove_piece(state.promoted)
+            board.add_piece(move.piece)
 
         # restore piece location
-        self.board.move_piece(move.piece, move.start)
+        board.move_piece(move.piece, move.start)
 
         # restore captured piece
-        if move.captured is not None:
-            self.board.add_piece(move.captured)
+        if state.captured is not None:
+            board.add_piece(state.captured)
 
     def is_legal(self, move):
         """Check if a move is legal.
@@ -109,10 +211,9 @@ class Game(object):
                 dx = move.to[0] - move.start[0]
                 if abs(dx) == 2:  # castle
                     through = move.start[0] + dx / 2, move.to[1]
-                    if any((piece.can_attack(self.board, through) or 
-                            piece.can_attack(self.board, move.start))
-                            for piece in self.board.pieces
-                            if piece.owner != move.piece.owner):
+                    color = move.piece.owner.opponent.color
+                    if (self.board.is_attacked(through, color) or
+                            self.board.is_attacked(move.start, color)):
                         return False
 
             with Position(self, move) as position:
@@ -120,12 +221,60 @@ class Game(object):
         else:
             return False
 
+    def legal_moves(self):
+        """Get a list of the legal moves for the current player.
+        The pieces pinned to the king and the pieces giving check are
+        found once, so most moves need no trial make and undo. Only
+        king moves and en passant captures are tested directly."""
+        board = self.board
+        player = self.current_player
+        if board._strays:
+            # pieces off the board can't be seen along the lines
+            return [move for move in player.moves(board)
+                    if self.is_legal(move)]
+        king = player.king
+        checks, pins = board.pins_and_checks(king.location, player.color)
+        moves = []
+        king_moves = []
+        en_passant = []
+        for move in player.moves(board):
+            piece = move.piece
+            if piece is king:
+                king_moves.append(move)
+            elif move.captured is not None and \
+                    move.captured.location != move.to:
+                en_passant.append(move)
+            elif len(checks) < 2:
+                if checks and move.to not in checks[0]:
+                    continue
+                line = pins.get(move.start)
+                if line is None or move.to in line:
+                    moves.append(move)
+
+        # the king mustn't hide behind itself from a slider
+        opponent = player.opponent.color
+        board.remove_piece(king)
+        for move in king_moves:
+            dx = move.to[0] - move.start[0]
+            if abs(dx) == 2:  # castle
+                if checks or board.is_attacked(
+                        (move.start[0] + dx / 2, move.to[1]), opponent):
+                    continue
+            if not board.is_attacked(move.to, opponent):
+                moves.append(move)
+        board.add_piece(king)
+
+        for move in en_passant:
+            with Position(self, move) as position:
+                if not player.is_in_check(position):
+                    moves.append(move)
+        return moves
+
     @property
     def is_over(self):
         """Check if the game is over for the given player.
         The game is over if a player cannot make any moves."""
-        return not any(self.is_legal(move)
-                for move in self.current_player.moves(self.board))
+        return not self.legal_moves()
 
     def is_checkmate(self, player):
         """Check if the given player is checkmated.
@@ -140,33 +289,163 @@ class Game(object):
         return self.is_over and not player.is_in_check(self.board)
 
     def from_fen(self, fen):
-        """Reset game to match given FEN string"""
-        self.board = Board()
-        components = fen.split(" ")
-        rows = components[0].split("/")
-        for row, row_str in enumerate(rows):
-            column = 0
-            for entry in row_str:
-                if entry.isdigit():
-                    column += int(entry)
-                else:
-                    sq = (column, 7 - row)
-                    player = self.players[entry.islower()]
-                    entry = entry.lower()
-                    if entry.lower() == "r":
-                        self.board.add_piece(Rook(player, sq))
-                    elif entry.lower() == "n":
-                        self.board.add_piece(Knight(player, sq))
-                    elif entry.lower() == "b":
-                        self.board.add_piece(Bishop(player, sq))
-                    elif entry.lower() == "q":
-                        self.board.add_piece(Queen(player, sq))
-                    elif entry.lower() == "k":
-                        self.board.add_piece(King(player, sq))
-                    elif entry.lower() == "p":
-                        self.board.add_piece(Pawn(player, sq))
-                    column += 1
-        # self.ply = int(components[1] == "b") + int(components[5]) - 1
+        """Reset game to match given FEN string.
+        Fields missing from the end of the string take the values they
+        have at the start of a game. The players are kept, with their
+        pieces and castling rights replaced.
+        Raises a ValueError if the string can't be read."""
+        fields = fen.split()
+        if not fields:
+            raise ValueError("Empty FEN string.")
+        fields += ["w", "KQkq", "-", "0", "1"][len(fields) - 1:]
+        placement, side, castling, en_passant, halfmove_clock, fullmove = \
+                fields[:6]
+
+        ranks = placement.split("/")
+        if len(ranks) != 8:
+            raise ValueError("FEN has %d ranks, not 8." % len(ranks))
+        pieces = []
+        for y, rank in zip(xrange(7, -1, -1), ranks):
+            x = 0
+            for entry in rank:
+                if entry in "12345678":
+                    x += int(entry)
+                    continue
+                try:
+                    piece_type = FEN_PIECES[entry.lower()]
+                except KeyError:
+                    raise ValueError("Unknown piece %r in FEN." % entry)
+                if x > 7:
+                    raise ValueError("FEN rank %r is not 8 squares." % rank)
+                pieces.append((piece_type, entry.islower(), (x, y)))
+                x += 1
+            if x != 8:
+                raise ValueError("FEN rank %r is not 8 squares." % rank)
+        kings = [black for piece_type, black, _ in pieces
+                if piece_type == King]
+        if sorted(kings) != [False, True]:
+            raise ValueError("FEN needs one king of each color.")
+        if side not in ("w", "b"):
+            raise ValueError("Unknown side to move %r in FEN." % side)
+        if FEN_CASTLING.match(castling) is None:
+            raise ValueError("Unknown castling rights %r in FEN." % castling)
+        if en_passant != "-" and (len(en_passant) != 2 or
+                en_passant[0] not in "abcdefgh" or
+                en_passant[1] != ("6" if side == "w" else "3")):
+            raise ValueError("Bad en passant square %r in FEN." % en_passant)
+        if not halfmove_clock.isdigit() or not fullmove.isdigit() or \
+                int(fullmove) < 1:
+            raise ValueError("Bad move counters %r %r in FEN."
+                    % (halfmove_clock, fullmove))
+
+        board = self.board = type(self.board)()
+        for player in self.players:
+            player.pieces = set()
+            player.king = None
+        for piece_type, black, location in pieces:
+            board.add_piece(piece_type(self.players[black], location))
+
+        white, black = self.players
+        white.castling = [("Q" in castling, "K" in castling)]
+        black.castling = [("q" in castling, "k" in castling)]
+        self.en_passant = None
+        if en_passant != "-":
+            # the pawn stands just past the square it skipped
+            x = "abcdefgh".index(en_passant[0])
+            y = int(en_passant[1]) - 1 + (1 if side == "b" else -1)
+            pawn = board.piece_at((x, y))
+            if type(pawn) == Pawn:
+                pawn.just_moved = True
+                self.en_passant = pawn
+        self.halfmove_clock = int(halfmove_clock)
+        self.ply = 2 * (int(fullmove) - 1) + (side == "b")
+        self.moves = []
+        self.states = []
+
+    def to_fen(self):
+        """Get the FEN string of the current position."""
+        return "%s %d %d" % (self._epd_fields(), self.halfmove_clock,
+                self.ply // 2 + 1)
+
+    def from_epd(self, epd):
+        """Reset game to match the given EPD record.
+        The move counters come from the hmvc and fmvn operations when
+        present. Returns a dict of the record's operations, mapping each
+        opcode to its operand string, or to None if it has none.
+        Raises a ValueError if the record can't be read."""
+        fields = epd.split(None, 4)
+        operations = {}
+        if len(fields) == 5:
+            text, position = fields[4].rstrip(), 0
+            while position < len(text):
+                match = EPD_OPERATION.match(text, position)
+                if match is None:
+                    raise ValueError("Unreadable EPD operations %r."
+                            % text[position:])
+                position = match.end()
+                opcode, operand = match.groups()
+                if opcode is None:
+                    continue
+                operand = operand.strip()
+                if len(operand) > 1 and operand[0] == operand[-1] == '"':
+                    operand = operand[1:-1]
+                operations[opcode] = operand or None
+        fields[4:] = [operations.get("hmvc") or "0",
+                operations.get("fmvn") or "1"]
+        self.from_fen(" ".join(fields))
+        return operations
+
+    def to_epd(self, operations=None):
+        """Get the EPD record of the current position with the given
+        operations, a dict like the one returned by from_epd.
+        Raises a ValueError for an operand EPD can't hold: one with a
+        double quote, or a semicolon outside a quoted string."""
+        epd = self._epd_fields()
+        for opcode, operand in sorted((operations or {}).items()):
+            if operand is None:
+                epd += " %s;" % opcode
+                continue
+            if '"' in operand or ";" in operand and \
+                    opcode not in STRING_OPCODES:
+                raise ValueError("EPD can't hold the operand %r of %s."
+                        % (operand, opcode))
+            if opcode in STRING_OPCODES:
+                epd += ' %s "%s";' % (opcode, operand)
+            else:
+                epd += " %s %s;" % (opcode, operand)
+        return epd
+
+    def _epd_fields(self):
+        """Get the first four fields of the position's FEN string."""
+        ranks = []
+        for y in xrange(7, -1, -1):
+            rank = ""
+            empty = 0
+            for x in xrange(8):
+                piece = self.board.piece_at((x, y))
+                if piece is None:
+                    empty += 1
+                    continue
+                if empty:
+                    rank += str(empty)
+                    empty = 0
+                letter = FEN_LETTERS[type(piece)]
+                rank += letter.upper() if piece.color == Color.WHITE \
+                        else letter
+            if empty:
+                rank += str(empty)
+            ranks.append(rank)
+
+        castling = ""
+        for player, letters in zip(self.players, ("QK", "qk")):
+            queenside, kingside = player.castling[-1]
+            castling += letters[1] * kingside + letters[0] * queenside
+        en_passant = "-"
+        if self.en_passant is not None:
+            pawn = self.en_passant
+            en_passant = "abcdefgh"[pawn.x] + str(pawn.y + 1 - pawn._vector)
+        return "%s %s %s %s" % ("/".join(ranks), "wb"[self.ply % 2],
+                castling or "-", en_passant)
 
     def play(self):
         """Play the game."""
@@ -188,42 +467,85 @@ class Game(object):
             print "Stalemate"
         print "Game over."
 
-    def perft(self, depth):
-        nodes = 0
-        for move in self.current_player.moves(self.board):
-            if self.is_legal(move):
-                if (depth == 1):
-                    nodes += 1
-                else:
-                    self._make_move(move)
-                    nodes += self.perft(depth - 1)
-                    self._undo_move()
+    def perft(self, depth, table=None):
+        """Count the positions reached after depth plies of legal moves.
+        The moves of the last ply are counted without being made. With
+        a PerftTable, counts are stored by position, so a position
+        reached again through a different order of moves is looked up
+        instead of counted again."""
+        if table is not None:
+            key = self.hash
+            nodes = table.probe_count(key, depth)
+            if nodes is not None:
+                return nodes
+        moves = self.legal_moves()
+        if depth == 1:
+            nodes = len(moves)
+        else:
+            nodes = 0
+            for move in moves:
+                self._make_move(move)
+                nodes += self.perft(depth - 1, table)
+                self._undo_move()
+        if table is not None:
+            table.store_count(key, depth, nodes)
         return nodes
 
     def perft_captures(self, depth):
-        nodes = 0
-        for move in self.current_player.moves(self.board):
-            if self.is_legal(move):
-                if (depth == 1):
-                    if (move.captured):
-                        nodes += 1
-                else:
-                    self._make_move(move)
-                    nodes += self.perft_captures(depth - 1)
-                    self._undo_move()
-        return nodes
+        return self.perft_stats(depth).captures
+
+    def perft_stats(self, depth):
+        """Walk the move tree to the given depth once, counting the kinds
+        of move made at the last ply. Returns a PerftStats record."""
+        totals = [0] * len(PerftStats._fields)
+        self._perft_stats(depth, totals)
+        return PerftStats(*totals)
+
+    def _perft_stats(self, depth, totals):
+        moves = self.legal_moves()
+        if depth > 1:
+            for move in moves:
+                self._make_move(move)
+                self._perft_stats(depth - 1, totals)
+                self._undo_move()
+            return
+        totals[0] += len(moves)
+        opponent = self.current_player.opponent
+        for move in moves:
+            if move.captured is not None:
+                totals[1] += 1
+                if move.captured.location != move.to:
+                    totals[2] += 1
+            elif type(move.piece) == King and \
+                    abs(move.to[0] - move.start[0]) == 2:
+                totals[3] += 1
+            if move.promotion is not None:
+                totals[4] += 1
+            self._make_move(move)
+            if opponent.is_in_check(self.board):
+                totals[5] += 1
+                if not self.legal_moves():
+                    totals[6] += 1
+            self._undo_move()
 
     def divide(self, depth):
         print self.board
         if (depth == 1):
-            for move in self.current_player.moves(self.board):
-                if self.is_legal(move):
-                    self._make_move(move)
-                    print move
-                    self._undo_move()
+            for move in self.legal_moves():
+                self._make_move(move)
+                print move
+                self._undo_move()
         else:
-            for move in self.current_player.moves(self.board):
-                if self.is_legal(move):
-                    self._make_move(move)
-                    print move, " ", self.perft(depth-1)
-                    self._undo_move()
+            for move in self.legal_moves():
+                self._make_move(move)
+                print move, " ", self.perft(depth-1)
+                self._undo_move()
+
+
+def new_game(board, fen):
+    """Set up a game on the given (empty) board from a FEN string."""
+    white, black = Player(Color.WHITE), Player(Color.BLACK)
+    white.opponent, black.opponent = black, white
+    game = Game(board, (white, black))
+    game.from_fen(fen)
+    return game
@@ -1,7 +1,12 @@
+from array import array
 from collections import namedtuple
 
+from attacks import LOCATIONS
+
 
 class Move(namedtuple('Move', 'piece start to captured promotion')):
+    __slots__ = ()
+
     def __new__(cls, piece, start, to, captured=None, promotion=None):
         # add default values
         return super(Move, cls).__new__(cls, piece, start, to, captured, promotion)
@@ -9,3 +14,81 @@ class Move(namedtuple('Move', 'piece start to captured promotion')):
     def __str__(self):
         return "%s from %s to %s captures %s" \
                 % (str(self.piece), self.start, self.to, self.captured)
+
+
+# A move can also be packed into 16 bits: the start square in bits 0-5,
+# the target square in bits 6-11 (square x + 8 * y for (x, y)) and the
+# kind of move in the top four. Promotions set PROMOTION and keep the
+# index of the promoted type in Pawn.promotable in the low two bits of
+# the kind, so captures that promote are CAPTURE | PROMOTION | index.
+QUIET, DOUBLE_PUSH, KING_CASTLE, QUEEN_CASTLE = 0, 1, 2, 3
+CAPTURE, EN_PASSANT = 4, 5
+PROMOTION = 8
+
+_INDEX = dict((location, i) for i, location in enumerate(LOCATIONS))
+
+# the _code of pawns and kings, their index in piece.PIECE_TYPES; the
+# piece module imports this one, so the types can't be imported here
+_PAWN, _KING = 0, 5
+
+
+def encode(move):
+    """Pack a move into a 16-bit integer."""
+    start, to = move.start, move.to
+    kind = QUIET
+    if move.promotion is not None:
+        kind = PROMOTION | move.piece.promotable.index(move.promotion)
+        if move.captured is not None:
+            kind |= CAPTURE
+    elif move.captured is not None:
+        kind = CAPTURE if move.captured.location == to else EN_PASSANT
+    elif abs(to[0] - start[0]) == 2 and move.piece._code == _KING:
+        kind = KING_CASTLE if to[0] > start[0] else QUEEN_CASTLE
+    elif abs(to[1] - start[1]) == 2 and move.piece._code == _PAWN:
+        kind = DOUBLE_PUSH
+    return _INDEX[start] | _INDEX[to] << 6 | kind << 12
+
+
+def decode(code, board):
+    """Unpack a move encoded in the position on the given board."""
+    start, to = LOCATIONS[code & 63], LOCATIONS[code >> 6 & 63]
+    kind = code >> 12
+    piece = board.piece_at(start)
+    captured = promotion = None
+    if kind == EN_PASSANT:
+        captured = board.piece_at((to[0], start[1]))
+    elif kind & CAPTURE:
+        captured = board.piece_at(to)
+    if kind & PROMOTION:
+        promotion = piece.promotable[kind & 3]
+    return Move(piece, start, to, captured, promotion)
+
+
+def encode_all(moves):
+    """Pack a sequence of moves into an array of unsigned shorts."""
+    return array('H', (encode(move) for move in moves))
+
+
+def coordinates(move):
+    """Write a move as its start and target squares, such as e7e8q."""
+    (x1, y1), (x2, y2) = move.start, move.to
+    promotion = ""
+    if move.promotion is not None:
+        promotion = "nbrq"[move.piece.promotable.index(move.promotion)]
+    return "%s%d%s%d%s" % ("abcdefgh"[x1], y1 + 1, "abcdefgh"[x2], y2 + 1,
+            promotion)
+
+
+def start_of(code):
+    """The square an encoded move starts from."""
+    return LOCATIONS[code & 63]
+
+
+def target_of(code):
+    """The square an encoded move goes to."""
+    return LOCATIONS[code >> 6 & 63]
+
+
+def kind_of(code):
+    """The kind of an encoded move, such as CAPTURE or KING_CASTLE."""
+    return code >> 12
@@ -1,42 +1,94 @@
 import re
 
-from move import Move
-from piece import Pawn, Queen, Knight, Bishop, Rook
+from move import encode, decode, coordinates
+from piece import Pawn, Queen, Knight, Bishop, Rook, King
 
+SAN_LETTERS = {Knight: "N", Bishop: "B", Rook: "R", Queen: "Q", King: "K"}
 
-class MoveParser(object):
-    def _parse_square(self, square):
-        """Convert a square into an x-y coordinate."""
-        assert len(square) == 2
-        f, r = square
-        assert f in "abcdefgh"
-        return "abcdefgh".index(f), int(r) - 1
-
-    def parse_move(self, string, board):
-        """Try to convert a string into a move.
-        Raises a ValueError if no move can be parsed."""
-        tokens = string.strip().split()
-        if len(tokens) < 2:
-            raise ValueError("Please enter two squares.")
+# two squares and a promotion as typed at the prompt, such as "e7 e8 Q"
+COORDINATES = re.compile(
+        r"^([a-h][1-8])[\s-]*([a-h][1-8])\s*(?:=?([NBRQnbrq])[a-z]*)?$")
+
+# number of positions whose move index a parser keeps
+INDEX_SIZE = 1024
+
+
+def _square(location):
+    return "abcdefgh"[location[0]] + str(location[1] + 1)
+
+
+def _notations(move):
+    """List the ways of writing a legal move: its coordinates, its SAN
+    without check marks and the variants of SAN that are seen in the
+    wild, such as 0-0, e8Q and Nbxd7 written as Nbd7 or Nb8d7."""
+    piece, (x, y), to = move.piece, move.start, _square(move.to)
+    notations = [coordinates(move)]
+    if type(piece) == King and abs(move.to[0] - x) == 2:
+        castle = "O-O" if move.to[0] > x else "O-O-O"
+        notations += [castle, castle.replace("O", "0")]
+    elif type(piece) == Pawn:
+        if move.captured is not None:
+            to = "abcdefgh"[x] + "x" + to
+        if move.promotion is not None:
+            letter = SAN_LETTERS[move.promotion]
+            notations += [to + "=" + letter, to + letter]
         else:
-            start_square = re.search("[a-h][1-8]", tokens[0])
-            end_square = re.search("[a-h][1-8]", tokens[1])
-            if start_square is None or end_square is None:
-                raise ValueError("Could not parse squares. Try again.")
-            else:
-                start = self._parse_square(start_square.group(0))
-                piece = board.piece_at(start)
-                to = self._parse_square(end_square.group(0))
-                promotion = None
-                if len(tokens) == 3 and type(piece) == Pawn:
-                    if tokens[2] in ("Queen", "Q"):
-                        promotion = Queen
-                    elif tokens[2] in ("Knight", "N"):
-                        promotion = Knight
-                    elif tokens[2] in ("Bishop", "B"):
-                        promotion = Bishop
-                    elif tokens[2] in ("Rook", "R"):
-                        promotion = Rook
-                    else:
-                        raise ValueError("Could not parse promotion.")
-                return Move(piece, start, to, board.piece_at(to), promotion)
+            notations.append(to)
+    else:
+        letter = SAN_LETTERS[type(piece)]
+        captures = ("", "x") if move.captured is not None else ("",)
+        for start in ("", "abcdefgh"[x], str(y + 1), _square(move.start)):
+            notations.extend(letter + start + capture + to
+                    for capture in captures)
+    return notations
+
+
+def move_index(moves):
+    """Map every way of writing each of the given legal moves to the
+    move's 16-bit code. Notations that fit more than one move, like Nd7
+    when both knights can go there, are left out."""
+    index = {}
+    ambiguous = set()
+    for move in moves:
+        code = encode(move)
+        for notation in _notations(move):
+            if index.setdefault(notation, code) != code:
+                ambiguous.add(notation)
+    for notation in ambiguous:
+        del index[notation]
+    return index
+
+
+class MoveParser(object):
+    def __init__(self):
+        self._indices = {}
+
+    def index(self, game):
+        """Get the move index of the current position of game.
+        The index is built from the legal moves the first time the
+        position is seen, and kept by its hash, so that each later
+        move in the position is found with a single lookup."""
+        key = game.hash
+        index = self._indices.get(key)
+        if index is None:
+            if len(self._indices) >= INDEX_SIZE:
+                self._indices.clear()
+            index = self._indices[key] = move_index(game.legal_moves())
+        return index
+
+    def parse(self, string, game):
+        """Find the legal move of the current player written in SAN,
+        such as Nbd7, exd8=Q+ or O-O, or as coordinates, such as e7e8q
+        or "e2 e4".
+        Raises a ValueError unless exactly one legal move matches."""
+        notation = string.strip().rstrip("+#!?")
+        index = self.index(game)
+        code = index.get(notation)
+        if code is None:
+            match = COORDINATES.match(notation)
+            if match is not None:
+                code = index.get("".join(
+                        group for group in match.groups() if group).lower())
+        if code is None:
+            raise ValueError("%r is not a legal move." % string)
+        return decode(code, game.board)
@@ -0,0 +1,82 @@
+"""Move ordering for alpha-beta search."""
+from move import encode
+
+
+class MoveOrderer(object):
+    """Sorts moves so that the search can cut off as early as possible.
+
+    A move remembered from an earlier search of the position goes first,
+    then captures and promotions by most valuable victim and least
+    valuable attacker, then the killer moves of the ply and finally the
+    remaining quiet moves by how often they caused cutoffs before."""
+    KILLERS = 2  # killer moves kept per ply
+
+    # orders of magnitude that keep the groups of moves apart
+    _BEST = 1 << 40
+    _CAPTURE = 1 << 30
+    _KILLER = 1 << 20
+
+    def __init__(self, values):
+        """Create an orderer using the given values of piece types."""
+        self.values = values
+        self.killers = []
+        self.history = {}
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+
+    @property
+    def first_move_cutoff_rate(self):
+        """The fraction of cutoffs caused by the first move searched."""
+        if not self.cutoffs:
+            return 0.0
+        return float(self.first_move_cutoffs) / self.cutoffs
+
+    def new_search(self):
+        """Forget the killer moves and age the history of cutoffs."""
+        self.killers = []
+        for k in self.history.keys():
+            self.history[k] //= 2
+        self.cutoffs = self.first_move_cutoffs = 0
+
+    def _killers(self, ply):
+        while len(self.killers) <= ply:
+            self.killers.append([])
+        return self.killers[ply]
+
+    def score(self, move, ply, best=None):
+        """Get the sort key of a move, larger being searched earlier.
+        best is the encoding of a move to put ahead of all others."""
+        code = encode(move)
+        if code == best:
+            return self._BEST
+        if move.captured is not None or move.promotion is not None:
+            gain = 0
+            if move.captured is not None:
+                gain += self.values[type(move.captured)]
+            if move.promotion is not None:
+                gain += self.values[move.promotion]
+            return self._CAPTURE + 16 * gain - self.values[type(move.piece)]
+        if code in self._killers(ply):
+            return self._KILLER
+        return self.history.get(
+                (type(move.piece), move.piece.color, move.to), 0)
+
+    def order(self, moves, ply, best=None):
+        """Sort a list of moves made at the given ply in place."""
+        moves.sort(key=lambda move: self.score(move, ply, best), reverse=True)
+        return moves
+
+    def cutoff(self, move, ply, depth, index):
+        """Record that the index-th move searched at a ply caused a cutoff
+        with depth plies left to search."""
+        self.cutoffs += 1
+        if index == 0:
+            self.first_move_cutoffs += 1
+        if move.captured is None and move.promotion is None:
+            killers = self._killers(ply)
+            code = encode(move)
+            if code not in killers:
+                killers.insert(0, code)
+                del killers[self.KILLERS:]
+            key = (type(move.piece), move.piece.color, move.to)
+            self.history[key] = self.history.get(key, 0) + depth * depth
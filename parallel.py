@@ -0,0 +1,183 @@
+"""Multiprocess search helpers.
+
+Worker processes are forked from the searching process, so each one
+starts with its own copy of the game, the player and the root moves and
+nothing has to be pickled on the way in. Only move indices and scores
+travel between processes, apart from what goes through a shared
+transposition table.
+
+Parallel perft works the other way round: each worker sets up its own
+game from a FEN string and the moves leading to its part of the tree,
+so it needs nothing from the parent but a few strings and integers."""
+import multiprocessing
+import random
+import time
+
+from board import Board
+from move import encode, decode, coordinates
+from position import Position
+
+# state of a worker process, set up by _init_root_worker
+_worker = {}
+
+
+def _init_root_worker(cpu, game, moves, alpha, node_limit):
+    cpu.nodes = cpu.qnodes = 0
+    cpu._node_limit = node_limit
+    _worker.update(cpu=cpu, game=game, moves=moves, alpha=alpha)
+
+
+def _search_root_move(task):
+    """Score one root move in a worker.
+    Returns the move index, its score or None if the search ran out of
+    budget, and the nodes and quiescence nodes it took."""
+    # imported here to keep this module free of a cycle with player
+    from player import SearchAborted
+    index, depth = task
+    cpu, game, alpha = _worker['cpu'], _worker['game'], _worker['alpha']
+    nodes, qnodes = cpu.nodes, cpu.qnodes
+    # Search just below the best score found so far by any worker, so
+    # that a move matching it still gets its exact score and ties are
+    # broken by move order, as in the serial search.
+    a = alpha.value - 1
+    try:
+        with Position(game, _worker['moves'][index]) as p:
+            score = cpu._alphabeta(game, p, depth - 1, cpu.opponent, a)
+    except SearchAborted:
+        score = None
+    else:
+        with alpha.get_lock():
+            if score > alpha.value:
+                alpha.value = score
+    return index, score, cpu.nodes - nodes, cpu.qnodes - qnodes
+
+
+def start_root_pool(cpu, game, moves, processes):
+    """Fork the worker processes for a parallel search of the root.
+    The workers last for every iteration of the search, so each keeps
+    its transposition table, killers and history from one iteration to
+    the next. Their node budget is shared out between them."""
+    alpha = multiprocessing.Value('d', float("-inf"))
+    budget = (cpu._node_limit - cpu.nodes - cpu.qnodes) / processes
+    pool = multiprocessing.Pool(processes, _init_root_worker,
+            (cpu, game, moves, alpha, budget))
+    return pool, alpha, list(moves)
+
+
+def stop_root_pool(root):
+    """Stop the worker processes of a parallel search."""
+    pool = root[0]
+    pool.terminate()
+    pool.join()
+
+
+def search_root(cpu, root, moves, depth):
+    """Score the root moves, in the given order, across the workers of
+    root. Returns the scores in the order of the moves, with None for
+    the moves whose search ran out of budget."""
+    pool, alpha, root_moves = root
+    alpha.value = float("-inf")
+    # the workers know the moves by their place when the pool started
+    indices = [root_moves.index(move) for move in moves]
+    order = dict((index, i) for i, index in enumerate(indices))
+    scores = [None] * len(moves)
+    for index, score, nodes, qnodes in pool.imap_unordered(
+            _search_root_move, [(index, depth) for index in indices]):
+        scores[order[index]] = score
+        cpu.nodes += nodes
+        cpu.qnodes += qnodes
+    return scores
+
+
+def _run_helper(cpu, game, moves, depth, seed):
+    """Search the root over and over, filling the shared table."""
+    from player import SearchAborted
+    random.Random(seed).shuffle(moves)
+    cpu._node_limit = float("inf")
+    try:
+        for iteration in xrange(1, depth + 1):
+            cpu._search_root(game, moves, iteration)
+    except SearchAborted:
+        pass
+
+
+def start_helpers(cpu, game, moves, depth, helpers):
+    """Start Lazy SMP helper processes for a search.
+    Every helper searches all the root moves, in its own random order
+    and with every other helper going one ply deeper, so that they
+    spread out over the tree. Their only output is what they store in
+    the player's transposition table, which must be shared."""
+    processes = []
+    for i in xrange(1, helpers + 1):
+        process = multiprocessing.Process(target=_run_helper,
+                args=(cpu, game, list(moves), depth + i % 2, i))
+        process.daemon = True
+        process.start()
+        processes.append(process)
+    return processes
+
+
+def stop_helpers(processes):
+    """Stop helper processes once the main search is done."""
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        process.join()
+
+
+def _perft_task(task):
+    """Count the nodes below the end of a line of encoded moves.
+    Returns the line and the count."""
+    from game import new_game
+    fen, backend, line, depth = task
+    game = new_game(backend(), fen)
+    for code in line:
+        game._make_move(decode(code, game.board))
+    return line, game.perft(depth - len(line))
+
+
+def _split(game, depth, split):
+    """List the lines of split moves, or fewer if the tree ends first,
+    that divide a perft of the game."""
+    if split == 0 or depth == 1:
+        return [()]
+    lines = []
+    for move in game.legal_moves():
+        code = encode(move)
+        with Position(game, move):
+            lines.extend((code,) + line
+                    for line in _split(game, depth - 1, split - 1))
+    return lines
+
+
+def perft(fen, depth, processes=None, backend=Board, split=1):
+    """Run a perft of the position in fen across a pool of processes.
+    The tree is shared out by the lines of its first split moves, so a
+    position with few moves can be split two plies deep to keep every
+    process busy. Returns a dict of the node count below each root
+    move, keyed by the move in coordinate notation, and the nodes
+    counted per second.
+    Raises a ValueError if split is less than 1, since the counts are
+    given per root move."""
+    if split < 1:
+        raise ValueError("Perft must be split at least one ply deep.")
+    from game import new_game
+    game = new_game(backend(), fen)
+    if depth < 2:
+        moves = game.legal_moves()
+        return dict((coordinates(move), 1) for move in moves), 0.0
+    names = dict((encode(move), coordinates(move))
+            for move in game.legal_moves())
+    tasks = [(fen, backend, line, depth)
+            for line in _split(game, depth, min(split, depth - 1))]
+    start = time.time()
+    pool = multiprocessing.Pool(processes)
+    try:
+        counts = dict.fromkeys(names.itervalues(), 0)
+        for line, nodes in pool.imap_unordered(_perft_task, tasks):
+            counts[names[line[0]]] += nodes
+    finally:
+        pool.terminate()
+        pool.join()
+    elapsed = time.time() - start
+    return counts, sum(counts.itervalues()) / elapsed if elapsed else 0.0
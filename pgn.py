@@ -0,0 +1,191 @@
+"""Streaming import of PGN archives.
+
+An archive can hold millions of games, so it is never read whole: the
+lines are cut into one chunk of text per game as they come, and the
+chunks are handed to a pool of processes, never more than a set number
+ahead of the records handed back. Each worker replays its games through
+a Game of its own, resolving the SAN moves against the legal moves of
+the position, and sends back a small record per game. Games that can't
+be read or replayed are skipped. Run this module on a file to measure
+the rate:
+
+    python pgn.py games.pgn"""
+import multiprocessing
+import re
+import sys
+import threading
+import time
+from collections import namedtuple
+
+from board import Board
+from move import coordinates
+from move_parser import MoveParser
+
+START = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+RESULTS = frozenset(["1-0", "0-1", "1/2-1/2", "*"])
+
+HEADER = re.compile(r'^\[(\w+)\s+"(.*)"\]\s*$')
+# comments, variation brackets, annotation glyphs, move numbers and
+# whatever else is left between them
+TOKEN = re.compile(r"\{[^}]*\}|;[^\n]*|[()]|\$\d+|\d+\.+|[^\s(){};]+")
+
+
+class Record(namedtuple('Record', 'headers moves fen positions')):
+    """A replayed game: its tag pairs, its moves in coordinate notation,
+    the FEN of the final position and, if asked for, the FEN of the
+    position before each move."""
+    __slots__ = ()
+
+
+def split_games(lines):
+    """Cut the lines of a PGN file into one string per game.
+    A game ends where the tag pairs of the next one begin."""
+    chunk = []
+    in_moves = False
+    for line in lines:
+        if line.startswith("%"):
+            continue
+        if line.startswith("["):
+            if in_moves:
+                yield "".join(chunk)
+                chunk = []
+                in_moves = False
+        elif line.strip():
+            in_moves = True
+        chunk.append(line)
+    if in_moves or any(line.strip() for line in chunk):
+        yield "".join(chunk)
+
+
+def parse(chunk):
+    """Read the tag pairs and the SAN moves of the main line of a game.
+    Returns a dict of the tags and a list of the moves."""
+    headers = {}
+    moves = []
+    lines = chunk.splitlines()
+    i = 0
+    while i < len(lines) and (lines[i].startswith("[") or
+            not lines[i].strip()):
+        match = HEADER.match(lines[i].strip())
+        if match is not None:
+            headers[match.group(1)] = match.group(2).replace('\\"', '"')
+        i += 1
+    depth = 0
+    for token in TOKEN.findall("\n".join(lines[i:])):
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            depth -= 1
+        elif depth or token[0] in "{;$" or token[0].isdigit() \
+                and token.endswith("."):
+            continue
+        elif token in RESULTS:
+            break
+        else:
+            moves.append(token)
+    return headers, moves
+
+
+# game and move parser reused by replay in each process, set up on
+# first use; the parser's indices of the opening positions carry over
+# from one game to the next
+_worker = {}
+
+
+def replay(chunk, positions=False):
+    """Replay the text of one game.
+    Returns its Record, or None if the game can't be read or one of its
+    moves is not legal."""
+    # imported here to keep this module free of a cycle with game
+    from game import new_game
+    headers, sans = parse(chunk)
+    try:
+        game = _worker.get('game')
+        if game is None:
+            game = _worker['game'] = new_game(Board(), START)
+            _worker['parser'] = MoveParser()
+        game.from_fen(headers.get("FEN", START))
+        parser = _worker['parser']
+        moves = []
+        fens = [] if positions else None
+        for san in sans:
+            move = parser.parse(san, game)
+            if positions:
+                fens.append(game.to_fen())
+            game._make_move(move)
+            moves.append(coordinates(move))
+    except ValueError:
+        return None
+    return Record(headers, moves, game.to_fen(), fens)
+
+
+def _replay_task(task):
+    return replay(*task)
+
+
+def _replay_chunks(lines, processes=None, ahead=256, positions=False):
+    """Replay the games in lines across a pool of processes.
+    Yields the Record of each game, or None for a skipped game, in the
+    order of the file. The pool is fed from one stream of games, so the
+    workers never wait for each other, and no more than ahead games are
+    read before their records have been yielded."""
+    pool = multiprocessing.Pool(processes)
+    slots = threading.Semaphore(ahead)
+    closed = []
+
+    def tasks():
+        # runs in the pool's task feeding thread, which would otherwise
+        # read the whole file into the queue
+        for chunk in split_games(lines):
+            slots.acquire()
+            if closed:
+                return
+            yield chunk, positions
+
+    try:
+        for record in pool.imap(_replay_task, tasks(), min(16, ahead)):
+            slots.release()
+            yield record
+    finally:
+        # wake the feeding thread, which the pool waits for
+        closed.append(True)
+        slots.release()
+        pool.terminate()
+        pool.join()
+
+
+def replay_all(lines, processes=None, ahead=256, positions=False):
+    """Replay the games in lines across a pool of processes.
+    Yields the Record of each game that could be replayed, in the order
+    of the file."""
+    for record in _replay_chunks(lines, processes, ahead, positions):
+        if record is not None:
+            yield record
+
+
+def rate(lines, processes=None, ahead=256):
+    """Time replaying the games in lines.
+    Returns the number of games replayed, the number skipped and the
+    games/sec."""
+    start = time.time()
+    count = skipped = 0
+    for record in _replay_chunks(lines, processes, ahead):
+        if record is None:
+            skipped += 1
+        else:
+            count += 1
+    elapsed = time.time() - start
+    games = count + skipped
+    return count, skipped, games / elapsed if elapsed else 0.0
+
+
+def main(path, processes=None):
+    with open(path) as f:
+        count, skipped, per_second = rate(f,
+                int(processes) if processes else None)
+    print "%d games  %d skipped  %.0f games/sec" % (count, skipped, per_second)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(*sys.argv[1:]))
@@ -1,13 +1,19 @@
-from itertools import product
-
+from attacks import KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS, \
+        BISHOP_LINES, ROOK_LINES, QUEEN_LINES
 from color import Color
 from move import Move
 
 
 class Piece(object):
-    """Abstract base class for pieces."""
+    """Abstract base class for pieces.
+    Pieces are made in their thousands during a search, so they keep
+    their attributes in slots and copy their owner's color."""
+    __slots__ = ('owner', 'color', '_location')
+    _code = 0  # index in PIECE_TYPES, set at the end of the module
+
     def __init__(self, owner, location):
         self.owner = owner
+        self.color = owner.color
         self._location = location
 
     @property
@@ -46,7 +52,7 @@ class Piece(object):
         return square in self.reachable(board)
 
     def __hash__(self):
-        return hash((type(self), self.location, self.owner.color))
+        return hash(self._location) ^ (self._code << 1 | self.color)
 
     def __eq__(self, other):
         return type(self) == type(other) and \
@@ -62,9 +68,31 @@ class Piece(object):
 
 class VectorPiece(Piece):
     """A piece that attacks along vectors."""
+    __slots__ = ()
     _vectors = []
+    _lines = {}  # see attacks.py
 
     def attackable(self, board):
+        lines = self._lines.get(self._location)
+        if lines is None:
+            # off the board, so not in the tables
+            return self._walk(board)
+        return self._lookup(board, lines)
+
+    def _lookup(self, board, lines):
+        """Get the attacked squares from the precomputed line tables."""
+        occupied = board.occupied
+        for mask, table in lines:
+            empty, ends, _ = table[occupied & mask]
+            for square in empty:
+                yield square
+            for square in ends:
+                piece = board.piece_at(square)
+                if piece is None or piece.owner != self.owner:
+                    yield square
+
+    def _walk(self, board):
+        """Get the attacked squares by walking each vector in turn."""
         for u, v in self._vectors:
             loc = x, y = self.x + u, self.y + v
             while board.is_on_board(loc):
@@ -79,53 +107,54 @@ class VectorPiece(Piece):
 
 
 class Bishop(VectorPiece):
+    __slots__ = ()
     _vectors = ((1, 1), (-1, 1), (-1, -1), (1, -1))
+    _lines = BISHOP_LINES
 
     def __str__(self):
         return "Bishop"
 
 
 class Rook(VectorPiece):
+    __slots__ = ()
     _vectors = ((1, 0), (0, 1), (-1, 0), (0, -1))
+    _lines = ROOK_LINES
 
     def __str__(self):
         return "Rook"
 
 
 class Queen(VectorPiece):
+    __slots__ = ()
     _vectors = ((1, 0), (0, 1), (-1, 0), (0, -1),
             (1, 1), (-1, -1), (1, -1), (-1, 1))
+    _lines = QUEEN_LINES
 
     def __str__(self):
         return "Queen"
 
 
 class Knight(Piece):
-    _vectors = ((1, 2), (1, -2), (-1, 2), (-1, -2),
-            (2, 1), (2, -1), (-2, 1), (-2, -1))
+    __slots__ = ()
 
     def attackable(self, board):
-        for vector in self._vectors:
-            x, y = vector
-            square = self.x + x, self.y + y
-            if board.is_on_board(square):
-                piece = board.piece_at(square)
-                if piece is None or piece.owner != self.owner:
-                    yield square
+        for square in KNIGHT_ATTACKS[self._location]:
+            piece = board.piece_at(square)
+            if piece is None or piece.owner != self.owner:
+                yield square
 
     def __str__(self):
         return "Knight"
 
 
 class King(Piece):
+    __slots__ = ()
+
     def attackable(self, board):
-        for x, y in product(range(-1, 2), range(-1, 2)):
-            if not (x == y == 0):
-                square = (self.x + x, self.y + y)
-                if board.is_on_board(square):
-                    piece = board.piece_at(square)
-                    if piece is None or piece.owner != self.owner:
-                        yield square
+        for square in KING_ATTACKS[self._location]:
+            piece = board.piece_at(square)
+            if piece is None or piece.owner != self.owner:
+                yield square
 
     def moves(self, board):
         """Get all the possible moves for the piece.
@@ -134,43 +163,43 @@ class King(Piece):
             yield move
 
         #Castling moves aren't necessarily legal
-        if not self.owner.is_in_check(board):
-            if self.owner.can_castle_queenside:
-                left1 = board.piece_at((self.x - 1, self.y))
-                left2 = board.piece_at((self.x - 2, self.y))
-                if left1 is None and left2 is None:
-                    yield Move(self, self.location, (self.x - 2, self.y))
-            if self.owner.can_castle_kingside:
-                if (board.piece_at((self.x + 1, self.y)) is None
-                    and board.piece_at((self.x + 2, self.y)) is None):
-                    yield Move(self, self.location, (self.x + 2, self.y))
+        owner = self.owner
+        home = 0 if self.color == Color.WHITE else 7
+        if self._location == (4, home) and not owner.is_in_check(board):
+            if owner.can_castle_queenside and \
+                    self._has_rook(board, (0, home)):
+                if (board.piece_at((3, home)) is None
+                    and board.piece_at((2, home)) is None
+                    and board.piece_at((1, home)) is None):
+                    yield Move(self, self.location, (2, home))
+            if owner.can_castle_kingside and \
+                    self._has_rook(board, (7, home)):
+                if (board.piece_at((5, home)) is None
+                    and board.piece_at((6, home)) is None):
+                    yield Move(self, self.location, (6, home))
+
+    def _has_rook(self, board, square):
+        piece = board.piece_at(square)
+        return type(piece) == Rook and piece.owner == self.owner
 
     def __str__(self):
         return "King"
 
 
 class Pawn(Piece):
+    __slots__ = ('just_moved', 'promotion_rank', 'start_rank', '_vector')
     promotable = (Knight, Bishop, Rook, Queen)
 
     def __init__(self, owner, location, just_moved=False):
         super(Pawn, self).__init__(owner, location)
         self.just_moved = just_moved
-
-    @property
-    def promotion_rank(self):
-        return 7 if self.owner.color == Color.WHITE else 0
-
-    @property
-    def start_rank(self):
-        return 1 if self.owner.color == Color.WHITE else 6
-
-    @property
-    def _vector(self):
-        return 1 if self.owner.color == Color.WHITE else -1
+        if self.color == Color.WHITE:
+            self.promotion_rank, self.start_rank, self._vector = 7, 1, 1
+        else:
+            self.promotion_rank, self.start_rank, self._vector = 0, 6, -1
 
     def attackable(self, board):
-        for dx in (-1, 1):
-            square = self.x + dx, self.y + self._vector
+        for square in PAWN_ATTACKS[self.color][self._location]:
             piece = board.piece_at(square)
             if piece is not None and piece.owner != self.owner:
                 yield square
@@ -192,7 +221,9 @@ class Pawn(Piece):
             piece = board.piece_at(square)
             if type(piece) == Pawn and piece.just_moved:
                 if piece.owner != self.owner:
-                    yield Move(self, self.location, square, piece)
+                    # the pawn moves behind the one it takes
+                    to = square[0], self.y + self._vector
+                    yield Move(self, self.location, to, piece)
 
         # forward
         square = self.x, self.y + self._vector
@@ -211,3 +242,9 @@ class Pawn(Piece):
 
     def __str__(self):
         return "Pawn"
+
+
+# Fixed order in which per-type tables (bitboards, hash keys) are laid out.
+PIECE_TYPES = (Pawn, Knight, Bishop, Rook, Queen, King)
+for _code, _type in enumerate(PIECE_TYPES):
+    _type._code = _code
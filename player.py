@@ -1,18 +1,30 @@
 # import pprint
+import multiprocessing
+import time
 
 from color import Color
+from evaluation import tapered
 from piece import Knight, Bishop, Rook, Queen, Pawn, King
 
+from move import encode
 from move_parser import MoveParser
+from ordering import MoveOrderer
+import parallel
 from position import Position
+from transposition import TranspositionTable, SharedTranspositionTable, \
+        EXACT, LOWER, UPPER
 
 
 class Player(object):
+    __slots__ = ('color', 'castling', 'opponent', 'pieces', 'king')
+
     def __init__(self, color):
         self.color = color
         self.castling = [(True, True)]
         self.opponent = None  # must be set after init
         self.pieces = set()
+        # kept up to date by the board as pieces are added and removed
+        self.king = None
 
     @property
     def can_castle_queenside(self):
@@ -22,15 +34,10 @@ class Player(object):
     def can_castle_kingside(self):
         return self.castling[-1][1]
 
-    @property
-    def king(self):
-        for piece in self.pieces:
-            if type(piece) == King:
-                return piece
-
     def moves(self, board):
         """Get all the moves a player can make."""
-        for piece in self.pieces:
+        # copy the pieces, since callers may make moves while iterating
+        for piece in list(self.pieces):
             for move in piece.moves(board):
                 yield move
 
@@ -38,8 +45,7 @@ class Player(object):
         """Check if the player is in check.
         A player is in check if any piece owned by an opponent
         can reach the player's King."""
-        return any(piece.can_attack(board, self.king.location)
-                for piece in self.opponent.pieces)
+        return board.is_attacked(self.king.location, self.opponent.color)
 
     def get_move(self, board):
         """Request a valid move from the player."""
@@ -55,46 +61,238 @@ class Player(object):
         return not self == other
 
 
+class SearchAborted(Exception):
+    """Raised inside the search once its time or node budget is spent."""
+
+
 class CPU(Player):
-    DEPTH = 2
+    DEPTH = 3  # plies, counting the move being chosen
+    QUIESCENCE_DEPTH = 4  # plies of captures searched past the horizon
+    HASH_SIZE = 16  # megabytes
 
-    def get_move(self, game):
-        """Request a valid move from the player."""
-        score = {}
-        for move in self.moves(game.board):
+    def __init__(self, color, hash_size=HASH_SIZE, depth=DEPTH,
+            time_limit=None, node_limit=None,
+            quiescence_depth=QUIESCENCE_DEPTH, processes=1, lazy=False,
+            mobility=False):
+        """Create a CPU player.
+        Each move is searched one ply deeper at a time until depth is
+        reached or time_limit (in seconds) or node_limit runs out.
+        Captures and promotions are then followed for up to
+        quiescence_depth more plies. With more than one process the
+        root moves are shared out among that many worker processes,
+        or, if lazy is set, helper processes search the whole root
+        alongside this one and share its transposition table. The
+        mobility term of the evaluation is off unless asked for."""
+        super(CPU, self).__init__(color)
+        if lazy and processes > 1:
+            self.table = SharedTranspositionTable(hash_size)
+        else:
+            self.table = TranspositionTable(hash_size)
+        self.orderer = MoveOrderer(self.RELATIVE_VALUE)
+        self.depth = depth
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.quiescence_depth = quiescence_depth
+        self.processes = processes
+        self.lazy = lazy
+        self.mobility = mobility
+        self.nodes = 0
+        self.qnodes = 0
+        self.completed_depth = 0
+        # set from another thread to end a running search early; kept
+        # in shared memory, so that it reaches the worker processes of
+        # a parallel search too
+        self._stop = multiprocessing.RawValue('b', False)
+        self._deadline = self._node_limit = float("inf")
+        self._root_ply = 0
+        # worker pool of a parallel search, kept for all its iterations
+        self._root = None
+
+    def get_move(self, game, depth=None, time_limit=None, node_limit=None):
+        """Request a valid move from the player.
+        Limits that are not given default to those of the player. The
+        best move of the deepest completed iteration is returned."""
+        if depth is None:
+            depth = self.depth
+        if time_limit is None:
+            time_limit = self.time_limit
+        if node_limit is None:
+            node_limit = self.node_limit
+        self._deadline = float("inf") if time_limit is None \
+                else time.time() + time_limit
+        self._node_limit = float("inf") if node_limit is None else node_limit
+        self.nodes = self.qnodes = 0
+        self.completed_depth = 0
+        self.orderer.new_search()
+        self._root_ply = game.ply
+
+        moves = game.legal_moves()
+        if not moves:
+            return None
+        best = moves[0]
+        helpers = []
+        if self.lazy and self.processes > 1:
+            helpers = parallel.start_helpers(self, game, moves, depth,
+                    self.processes - 1)
+        elif self.processes > 1:
+            self._root = parallel.start_root_pool(self, game, moves,
+                    self.processes)
+        try:
+            for iteration in xrange(1, depth + 1):
+                best = self._search_root(game, moves, iteration)
+                self.completed_depth = iteration
+                # the next iteration starts with the best move so far
+                moves.remove(best)
+                moves.insert(0, best)
+        except SearchAborted:
+            pass
+        finally:
+            parallel.stop_helpers(helpers)
+            if self._root is not None:
+                parallel.stop_root_pool(self._root)
+                self._root = None
+        return best
+
+    @property
+    def stopped(self):
+        return bool(self._stop.value)
+
+    @stopped.setter
+    def stopped(self, stopped):
+        self._stop.value = stopped
+
+    def stop(self):
+        """End a running search at its next node, as if its budget had
+        run out, in this process and in any it has forked to search.
+        The flag stays set until cleared, so that a stop that comes in
+        just before a search starts still ends it."""
+        self._stop.value = True
+
+    def _search_root(self, game, moves, depth):
+        """Find the best of the given moves with a search of depth plies."""
+        if self._root is not None:
+            return self._search_root_parallel(game, moves, depth)
+        a, best = float("-inf"), moves[0]
+        for move in moves:
             with Position(game, move) as p:
-                score[move] = self._alphabeta(game, p, self.DEPTH, self)
-        # pprint.pprint(score)
+                score = self._alphabeta(game, p, depth - 1, self.opponent, a)
+            if score > a:
+                a, best = score, move
+        return best
 
-        # for some reason, max(score.keys, score.get) doesn't work.
-        best_k, best_v = None, float("-inf")
-        for k, v in score.items():
-            if v > best_v:
-                best_k = k
-                best_v = v
-        return best_k
+    def _search_root_parallel(self, game, moves, depth):
+        """Find the best of the given moves by searching them in parallel.
+        The first of the best scoring moves is chosen, as in the serial
+        search."""
+        scores = parallel.search_root(self, self._root, moves, depth)
+        if None in scores:
+            raise SearchAborted()
+        return moves[scores.index(max(scores))]
 
     def _alphabeta(self, game, board, depth, player, a=float("-inf"), b=float("inf")):
         """Evaluate the fitness of a position."""
         # TODO: ref to game
         if depth == 0:
-            return self._score(board)
+            return self._quiesce(game, board, player, a, b,
+                    self.quiescence_depth)
         else:
+            self.nodes += 1
+            self._check_budget()
+            key = game.hash
+            entry = self.table.probe(key)
+            if entry is not None:
+                if entry.depth >= depth:
+                    if entry.bound == EXACT:
+                        return entry.score
+                    elif entry.bound == LOWER:
+                        a = max(a, entry.score)
+                    else:
+                        b = min(b, entry.score)
+                    if b <= a:
+                        return entry.score
+            ply = game.ply - self._root_ply
+            moves = game.legal_moves()
+            if not moves:
+                return self._game_over_score(player, board, ply)
+            moves = self.orderer.order(moves, ply, entry and entry.move)
+            alpha, beta = a, b
+            best = None
             if player == self:
-                for move in player.moves(board):
+                for i, move in enumerate(moves):
                     with Position(game, move) as p:
-                        a = max(a, self._alphabeta(game, p, depth - 1, player.opponent, a, b))
-                        if b <= a:
-                            break
+                        score = self._alphabeta(game, p, depth - 1, player.opponent, a, b)
+                    if score > a:
+                        a, best = score, move
+                    if b <= a:
+                        self.orderer.cutoff(move, ply, depth, i)
+                        break
+                bound = UPPER if a <= alpha else LOWER if a >= beta else EXACT
+                self.table.store(key, depth, a, bound,
+                        best and encode(best))
                 return a
             else:
-                for move in player.moves(board):
+                for i, move in enumerate(moves):
                     with Position(game, move) as p:
-                        b = min(b, self._alphabeta(game, p, depth - 1, player.opponent, a, b))
-                        if b <= a:
-                            break
+                        score = self._alphabeta(game, p, depth - 1, player.opponent, a, b)
+                    if score < b:
+                        b, best = score, move
+                    if b <= a:
+                        self.orderer.cutoff(move, ply, depth, i)
+                        break
+                bound = LOWER if b >= beta else UPPER if b <= alpha else EXACT
+                self.table.store(key, depth, b, bound,
+                        best and encode(best))
                 return b
 
+    def _game_over_score(self, player, board, ply):
+        """Score a position where the player to move has no legal moves.
+        Mates found nearer the root score further from zero."""
+        if not player.is_in_check(board):
+            return 0
+        score = self.MATE - ply
+        return -score if player == self else score
+
+    def _quiesce(self, game, board, player, a, b, depth):
+        """Evaluate a position once its captures and promotions play out.
+        The player to move may stand pat instead of making a capture."""
+        self.qnodes += 1
+        self._check_budget()
+        stand_pat = self._score(board)
+        if depth == 0:
+            return stand_pat
+        # legal moves only: a pinned piece's capture would otherwise
+        # be answered by taking the king, which scores as nothing
+        moves = [move for move in game.legal_moves()
+                if move.captured is not None or move.promotion is not None]
+        self.orderer.order(moves, game.ply - self._root_ply)
+        if player == self:
+            if stand_pat >= b:
+                return b
+            a = max(a, stand_pat)
+            for move in moves:
+                with Position(game, move) as p:
+                    a = max(a, self._quiesce(game, p, player.opponent, a, b, depth - 1))
+                if b <= a:
+                    break
+            return a
+        else:
+            if stand_pat <= a:
+                return a
+            b = min(b, stand_pat)
+            for move in moves:
+                with Position(game, move) as p:
+                    b = min(b, self._quiesce(game, p, player.opponent, a, b, depth - 1))
+                if b <= a:
+                    break
+            return b
+
+    def _check_budget(self):
+        """Abort the search if it has run out of time or nodes or has
+        been stopped."""
+        if self.nodes + self.qnodes >= self._node_limit or \
+                time.time() >= self._deadline or self._stop.value:
+            raise SearchAborted()
+
     RELATIVE_VALUE = {
             Pawn: 1,
             Knight: 3,
@@ -104,16 +302,24 @@ class CPU(Player):
             King: 0
             }
 
+    MOBILITY_WEIGHT = 4  # centipawns per move
+    MATE = 100000  # centipawns, beyond any material score
+
     def _score(self, board):
-        """Evaluate the static fitness of a position."""
-        score = 0
-        for piece in board.pieces:
-            if piece.owner == self:
-                score += self.RELATIVE_VALUE[type(piece)]
-                score += sum(1 for _ in piece.moves(board))
-            else:
-                score -= self.RELATIVE_VALUE[type(piece)]
-                score -= sum(1 for _ in piece.moves(board))
+        """Evaluate the static fitness of a position.
+        The board keeps its material and piece-square totals up to date
+        as moves are made, so only the optional mobility term, which
+        has to generate every move, costs more than a few lookups."""
+        score = tapered(board.mg_score, board.eg_score, board.phase)
+        if self.color == Color.BLACK:
+            score = -score
+        if self.mobility:
+            for piece in board.pieces:
+                mobility = sum(1 for _ in piece.moves(board))
+                if piece.owner == self:
+                    score += self.MOBILITY_WEIGHT * mobility
+                else:
+                    score -= self.MOBILITY_WEIGHT * mobility
         return score
 
 
@@ -123,20 +329,10 @@ class Human(Player):
         self._move_parser = MoveParser()
 
     def get_move(self, game):
-        """Request a valid move from the player."""
-        board = game.board
+        """Request a legal move from the player."""
         while True:
             try:
-                move = self._move_parser.parse_move(\
-                        raw_input("Please enter your move: "), board)
+                return self._move_parser.parse(
+                        raw_input("Please enter your move: "), game)
             except ValueError as e:
                 print e
-            else:
-                if move.piece is None:
-                    print "No piece found."
-                elif move.piece.owner != self:
-                    print "You do not own that piece."
-                elif not move.piece.can_reach(board, move.to):
-                    print "Not a valid move."
-                else:
-                    return move
@@ -0,0 +1,82 @@
+import unittest
+
+from attacks import KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS, \
+        KNIGHT_MASKS, KING_MASKS, PAWN_MASKS, LOCATION_BITS, \
+        BISHOP_LINES, ROOK_LINES, slider_mask
+from bitboard import BitBoard
+from board import Board
+from color import Color
+from game import new_game
+from piece import VectorPiece
+
+KIWIPETE = "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq -"
+
+
+class LeaperTableTest(unittest.TestCase):
+    def test_knight_corner(self):
+        self.assertEquals(sorted(KNIGHT_ATTACKS[0, 0]), [(1, 2), (2, 1)])
+
+    def test_knight_center(self):
+        self.assertEquals(len(KNIGHT_ATTACKS[3, 3]), 8)
+
+    def test_king_corner(self):
+        self.assertEquals(sorted(KING_ATTACKS[7, 7]),
+                [(6, 6), (6, 7), (7, 6)])
+
+    def test_king_center(self):
+        self.assertEquals(len(KING_ATTACKS[4, 4]), 8)
+
+    def test_white_pawn(self):
+        self.assertEquals(sorted(PAWN_ATTACKS[Color.WHITE][3, 1]),
+                [(2, 2), (4, 2)])
+
+    def test_black_pawn_edge(self):
+        self.assertEquals(PAWN_ATTACKS[Color.BLACK][0, 6], ((1, 5),))
+
+    def test_pawn_last_rank(self):
+        self.assertEquals(PAWN_ATTACKS[Color.WHITE][4, 7], ())
+
+    def test_every_square(self):
+        self.assertEquals(len(KNIGHT_ATTACKS), 64)
+        self.assertEquals(len(PAWN_ATTACKS[Color.BLACK]), 64)
+
+
+class MaskTest(unittest.TestCase):
+    def test_knight_corner(self):
+        self.assertEquals(KNIGHT_MASKS[0, 0], 1 << 10 | 1 << 17)
+
+    def test_king_matches_squares(self):
+        self.assertEquals(bin(KING_MASKS[4, 4]).count("1"), 8)
+
+    def test_pawn(self):
+        self.assertEquals(PAWN_MASKS[Color.WHITE][0, 0], 1 << 9)
+
+
+class SliderTableTest(unittest.TestCase):
+    def test_empty_rank(self):
+        mask, table = ROOK_LINES[0, 0][0]
+        empty, ends, _ = table[0]
+        self.assertEquals(empty + ends, tuple((x, 0) for x in range(1, 8)))
+
+    def test_blocked_rank(self):
+        occupied = LOCATION_BITS[3, 0] | LOCATION_BITS[5, 0]
+        self.assertEquals(slider_mask(ROOK_LINES, (0, 0), occupied),
+                sum(LOCATION_BITS[x, 0] for x in range(1, 4)) |
+                sum(LOCATION_BITS[0, y] for y in range(1, 8)))
+
+    def test_bishop_center(self):
+        self.assertEquals(bin(slider_mask(BISHOP_LINES, (3, 3), 0))
+                .count("1"), 13)
+
+    def test_lookup_matches_walk(self):
+        for backend in (Board, BitBoard):
+            board = new_game(backend(), KIWIPETE).board
+            for piece in board.pieces:
+                if isinstance(piece, VectorPiece):
+                    self.assertEquals(
+                            sorted(piece.attackable(board)),
+                            sorted(piece._walk(board)))
+
+
+if __name__ == "__main__":
+    unittest.main()
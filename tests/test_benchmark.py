@@ -0,0 +1,96 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+from StringIO import StringIO
+
+import benchmark
+from benchmark import POSITIONS, run_suite, regressions, time_perft, main
+from board import Board
+from game import new_game
+
+
+class SuiteTest(unittest.TestCase):
+    def test_counts_match(self):
+        for result in run_suite(depth=2):
+            self.assertEquals(result["nodes"], result["expected"])
+        self.assertEquals(len(run_suite(depth=1)), len(POSITIONS))
+
+    def test_named_position(self):
+        results = run_suite(depth=1, names=["kiwipete"])
+        self.assertEquals([result["nodes"] for result in results], [48])
+
+
+class RegressionTest(unittest.TestCase):
+    def result(self, rate, depth=3):
+        return {"name": "initial", "depth": depth, "nodes_per_sec": rate}
+
+    def test_within_threshold(self):
+        self.assertEquals(regressions([self.result(95)],
+                [self.result(100)], 10), [])
+
+    def test_regression(self):
+        self.assertEquals(regressions([self.result(80)],
+                [self.result(100)], 10), ["initial"])
+
+    def test_other_depth_not_compared(self):
+        self.assertEquals(regressions([self.result(10, 4)],
+                [self.result(100)], 10), [])
+
+
+    def test_untimed_not_compared(self):
+        self.assertEquals(regressions([self.result(0.0)],
+                [self.result(100)], 10), [])
+
+
+class FrozenClock(object):
+    def time(self):
+        return 0.0
+
+
+class UntimedTest(unittest.TestCase):
+    def setUp(self):
+        self.clock, benchmark.time = benchmark.time, FrozenClock()
+
+    def tearDown(self):
+        benchmark.time = self.clock
+
+    def test_time_perft(self):
+        game = new_game(Board(), POSITIONS[0][1])
+        self.assertEquals(time_perft(game, 1), (20, 0.0))
+
+
+class BaselineTest(unittest.TestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".json")
+        os.close(handle)
+        # main reports on the console
+        self.streams = sys.stdout, sys.stderr
+        sys.stdout = sys.stderr = StringIO()
+
+    def tearDown(self):
+        sys.stdout, sys.stderr = self.streams
+        os.remove(self.path)
+
+    def write_baseline(self, backend):
+        with open(self.path, "w") as f:
+            json.dump({"backend": backend, "positions": []}, f)
+
+    def run_against_baseline(self):
+        return main(["--position", "kiwipete", "--depth", "1",
+                "--backend", "bitboard", "--baseline", self.path])
+
+    def test_same_backend(self):
+        self.write_baseline("bitboard")
+        self.assertEquals(self.run_against_baseline(), 0)
+
+    def test_other_backend_refused(self):
+        self.write_baseline("board")
+        with self.assertRaises(SystemExit) as raised:
+            self.run_against_baseline()
+        self.assertEquals(raised.exception.code, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
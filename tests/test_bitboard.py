@@ -0,0 +1,134 @@
+import unittest
+
+from bitboard import BitBoard, square_index
+from board import Board
+from color import Color
+from player import Player
+from game import Game
+from piece import King, Knight, Rook, Queen, Pawn
+import test_board
+
+
+class ChessTest(unittest.TestCase):
+    def setUp(self):
+        self.board = BitBoard()
+        self.white = Player(Color.WHITE)
+        self.black = Player(Color.BLACK)
+        self.white.opponent, self.black.opponent = self.black, self.white
+        self.game = Game(self.board, (self.white, self.black))
+
+
+class SquareIndexTest(unittest.TestCase):
+    def test_a1(self):
+        self.assertEquals(square_index((0, 0)), 0)
+
+    def test_h1(self):
+        self.assertEquals(square_index((7, 0)), 7)
+
+    def test_h8(self):
+        self.assertEquals(square_index((7, 7)), 63)
+
+
+class PiecesTest(ChessTest):
+    def test_ensure_board_has_added_piece(self):
+        pawn = Pawn(self.white, (0, 1))
+        self.board.add_piece(pawn)
+        self.assertTrue(pawn in self.board.pieces)
+
+    def test_ensure_player_has_added_piece(self):
+        pawn = Pawn(self.white, (0, 1))
+        self.board.add_piece(pawn)
+        self.assertTrue(pawn in self.white.pieces)
+
+    def test_ensure_board_does_not_have_removed_piece(self):
+        pawn = Pawn(self.white, (0, 1))
+        self.board.add_piece(pawn)
+        self.board.remove_piece(pawn)
+        self.assertTrue(pawn not in self.board.pieces)
+
+    def test_ensure_moving_piece_changes_piece_location(self):
+        pawn = Pawn(self.white, (0, 1))
+        self.board.add_piece(pawn)
+        self.board.move_piece(pawn, (0, 2))
+        self.assertEquals(self.board.piece_at((0, 2)), pawn)
+        self.assertEquals(self.board.piece_at((0, 1)), None)
+
+    def test_ensure_moving_piece_does_not_break_invariants(self):
+        pawn = Pawn(self.white, (0, 1))
+        self.board.add_piece(pawn)
+        self.board.move_piece(pawn, (0, 2))
+        self.assertTrue(pawn in self.white.pieces and pawn in self.board.pieces)
+
+
+class KingTest(ChessTest):
+    def test_tracks_king(self):
+        king = King(self.black, (4, 7))
+        self.board.add_piece(king)
+        self.board.move_piece(king, (3, 7))
+        self.assertTrue(self.black.king is king)
+        self.board.remove_piece(king)
+        self.assertEquals(self.black.king, None)
+
+
+class MaskTest(ChessTest):
+    def test_bitboard_tracks_piece(self):
+        self.board.add_piece(Knight(self.black, (1, 7)))
+        self.assertEquals(self.board.bitboard(Knight, Color.BLACK), 1 << 57)
+        self.assertEquals(self.board.bitboard(Knight, Color.WHITE), 0)
+
+    def test_occupancy_follows_moves(self):
+        rook = Rook(self.white, (0, 0))
+        self.board.add_piece(rook)
+        self.board.move_piece(rook, (0, 4))
+        self.assertEquals(self.board.occupancy(Color.WHITE), 1 << 32)
+        self.assertEquals(self.board.occupied, 1 << 32)
+
+    def test_removed_piece_clears_masks(self):
+        queen = Queen(self.white, (3, 0))
+        self.board.add_piece(queen)
+        self.board.remove_piece(queen)
+        self.assertEquals(self.board.occupied, 0)
+        self.assertEquals(self.board.bitboard(Queen, Color.WHITE), 0)
+
+
+class OnBoardTest(ChessTest):
+    def test_is_on_board_corner(self):
+        self.assertTrue(self.board.is_on_board((7, 7)))
+
+    def test_off_board(self):
+        self.assertFalse(self.board.is_on_board((8, 8)))
+
+    def test_no_piece_off_board(self):
+        self.assertEquals(self.board.piece_at((-1, 3)), None)
+
+
+class EqualityTest(ChessTest):
+    def test_equal_to_dict_board(self):
+        king = King(self.white, (4, 0))
+        self.board.add_piece(king)
+        self.assertEquals(self.board, Board({(4, 0): king}))
+
+
+class PerftTest(ChessTest):
+    FEN = "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"
+
+    def test_from_fen_keeps_backend(self):
+        self.game.from_fen(self.FEN)
+        self.assertTrue(isinstance(self.game.board, BitBoard))
+
+    def test_matches_dict_board(self):
+        self.game.from_fen(self.FEN)
+        white, black = Player(Color.WHITE), Player(Color.BLACK)
+        white.opponent, black.opponent = black, white
+        game = Game(Board(), (white, black))
+        game.from_fen(self.FEN)
+        self.assertEquals(self.game.perft(1), game.perft(1))
+        self.assertEquals(str(self.game.board), str(game.board))
+
+
+class IsAttackedTest(test_board.IsAttackedTest):
+    backend = BitBoard
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -77,5 +77,52 @@ class PieceAtTest(ChessTest):
         self.assertEquals(self.board.piece_at((0, 0)), king)
 
 
+class IsAttackedTest(unittest.TestCase):
+    """Attack queries on an empty board of type backend.
+    test_bitboard runs them again on the bitboard."""
+    backend = Board
+
+    def setUp(self):
+        self.board = self.backend()
+        self.white = Player(Color.WHITE)
+        self.black = Player(Color.BLACK)
+        self.white.opponent, self.black.opponent = self.black, self.white
+
+    def test_empty(self):
+        self.assertFalse(self.board.is_attacked((4, 4), Color.BLACK))
+
+    def test_knight(self):
+        self.board.add_piece(Knight(self.black, (0, 0)))
+        self.assertTrue(self.board.is_attacked((1, 2), Color.BLACK))
+        self.assertFalse(self.board.is_attacked((1, 2), Color.WHITE))
+
+    def test_pawn_attacks_empty_square(self):
+        self.board.add_piece(Pawn(self.black, (4, 5)))
+        self.assertTrue(self.board.is_attacked((3, 4), Color.BLACK))
+        self.assertFalse(self.board.is_attacked((4, 4), Color.BLACK))
+        self.assertFalse(self.board.is_attacked((3, 6), Color.BLACK))
+
+    def test_rook_blocked(self):
+        self.board.add_piece(Rook(self.black, (0, 7)))
+        self.assertTrue(self.board.is_attacked((0, 0), Color.BLACK))
+        self.board.add_piece(Pawn(self.white, (0, 3)))
+        self.assertFalse(self.board.is_attacked((0, 0), Color.BLACK))
+        self.assertTrue(self.board.is_attacked((0, 3), Color.BLACK))
+
+    def test_queen_diagonal(self):
+        self.board.add_piece(Queen(self.white, (2, 2)))
+        self.assertTrue(self.board.is_attacked((7, 7), Color.WHITE))
+        self.assertFalse(self.board.is_attacked((3, 5), Color.WHITE))
+
+    def test_bishop_not_on_file(self):
+        self.board.add_piece(Bishop(self.white, (2, 2)))
+        self.assertFalse(self.board.is_attacked((2, 5), Color.WHITE))
+
+    def test_king(self):
+        self.board.add_piece(King(self.white, (4, 0)))
+        self.assertTrue(self.board.is_attacked((5, 1), Color.WHITE))
+        self.assertFalse(self.board.is_attacked((6, 1), Color.WHITE))
+
+
 if __name__ == "__main__":
     unittest.main()
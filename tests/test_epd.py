@@ -0,0 +1,28 @@
+import unittest
+
+from bitboard import BitBoard
+import epd
+
+
+class ReadTest(unittest.TestCase):
+    LINES = ["# perft suite",
+            "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - ;D1 20;",
+            "",
+            "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - ;D1 14;"]
+
+    def test_counts(self):
+        for game, operations in epd.read(self.LINES):
+            self.assertEquals(game.perft(1), int(operations["D1"]))
+
+    def test_reuses_game(self):
+        games = set(id(game) for game, _ in epd.read(self.LINES, BitBoard))
+        self.assertEquals(len(games), 1)
+
+    def test_rate(self):
+        count, per_second = epd.rate(self.LINES)
+        self.assertEquals(count, 2)
+        self.assertTrue(per_second > 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
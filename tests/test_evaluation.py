@@ -0,0 +1,111 @@
+import unittest
+
+from bitboard import BitBoard
+from board import Board
+from color import Color
+from evaluation import evaluate, tapered, piece_values, PHASE_MAX
+from move import Move
+from player import CPU
+from game import Game
+from piece import King, Knight, Rook, Queen, Pawn
+
+
+class ChessTest(unittest.TestCase):
+    def setUp(self):
+        self.board = Board(dict())
+        self.white = CPU(Color.WHITE, hash_size=1)
+        self.black = CPU(Color.BLACK, hash_size=1)
+        self.white.opponent, self.black.opponent = self.black, self.white
+        self.game = Game(self.board, (self.white, self.black))
+
+
+class PieceValuesTest(ChessTest):
+    def test_mirrored(self):
+        white = piece_values(Knight(self.white, (1, 0)))
+        black = piece_values(Knight(self.black, (1, 7)))
+        self.assertEquals(white[:2], (-black[0], -black[1]))
+        self.assertEquals(white[2], black[2])
+
+    def test_center_beats_rim(self):
+        center = piece_values(Knight(self.white, (3, 3)))
+        rim = piece_values(Knight(self.white, (0, 3)))
+        self.assertTrue(center[0] > rim[0])
+
+    def test_king_prefers_center_in_endgame(self):
+        corner = piece_values(King(self.white, (6, 0)))
+        center = piece_values(King(self.white, (4, 4)))
+        self.assertTrue(corner[0] > center[0])
+        self.assertTrue(corner[1] < center[1])
+
+
+class TaperedTest(unittest.TestCase):
+    def test_middlegame(self):
+        self.assertEquals(tapered(100, -100, PHASE_MAX), 100)
+
+    def test_endgame(self):
+        self.assertEquals(tapered(100, -100, 0), -100)
+
+    def test_halfway(self):
+        self.assertEquals(tapered(100, -100, PHASE_MAX // 2), 0)
+
+    def test_promoted_material_is_capped(self):
+        self.assertEquals(tapered(100, -100, PHASE_MAX + 4), 100)
+
+
+class IncrementalTest(ChessTest):
+    START = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+    KIWIPETE = \
+        "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"
+
+    def totals(self, board):
+        return board.mg_score, board.eg_score, board.phase
+
+    def test_start_position(self):
+        self.game.from_fen(self.START)
+        self.assertEquals(self.totals(self.game.board), (0, 0, PHASE_MAX))
+
+    def test_bitboard_start_position(self):
+        self.game.board = BitBoard()
+        self.game.from_fen(self.START)
+        self.assertEquals(self.totals(self.game.board), (0, 0, PHASE_MAX))
+
+    def test_promotion(self):
+        pawn = Pawn(self.white, (0, 6))
+        self.board.add_piece(pawn)
+        self.game._make_move(Move(pawn, (0, 6), (0, 7), None, Queen))
+        self.assertEquals(self.totals(self.board), evaluate(self.board.pieces))
+        self.assertEquals(self.board.phase, 4)
+        self.game._undo_move()
+        self.assertEquals(self.totals(self.board), evaluate(self.board.pieces))
+
+    def test_make_undo(self):
+        self.game.from_fen(self.KIWIPETE)
+        board = self.game.board
+        before = self.totals(board)
+        for move in list(self.game.current_player.moves(board)):
+            self.game._make_move(move)
+            self.assertEquals(self.totals(board), evaluate(board.pieces))
+            self.game._undo_move()
+        self.assertEquals(self.totals(board), before)
+
+
+class ScoreTest(ChessTest):
+    def test_perspective(self):
+        self.board.add_piece(King(self.white, (4, 0)))
+        self.board.add_piece(King(self.black, (4, 7)))
+        self.board.add_piece(Rook(self.white, (0, 0)))
+        self.assertTrue(self.white._score(self.board) > 400)
+        self.assertEquals(self.white._score(self.board),
+                -self.black._score(self.board))
+
+    def test_mobility(self):
+        self.board.add_piece(King(self.white, (4, 0)))
+        self.board.add_piece(King(self.black, (4, 7)))
+        self.board.add_piece(Rook(self.white, (0, 0)))
+        score = self.white._score(self.board)
+        self.white.mobility = True
+        self.assertTrue(self.white._score(self.board) > score)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,7 +5,8 @@ from color import Color
 from move import Move
 from move_parser import MoveParser
 from player import Player
-from game import Game
+from game import Game, PerftStats
+from transposition import PerftTable
 from piece import King, Knight, Rook, Bishop, Queen, Pawn
 
 
@@ -35,6 +36,137 @@ class GameTest(unittest.TestCase):
         self.assertEquals(got, expected)
 
 
+class FenTest(ChessTest):
+    def test_side_to_move(self):
+        self.game.from_fen("8/8/8/8/8/8/8/K6k b - - 0 1")
+        self.assertEquals(self.game.current_player, self.black)
+
+    def test_move_numbers(self):
+        self.game.from_fen("8/8/8/8/8/8/8/K6k w - - 7 12")
+        self.assertEquals(self.game.ply, 22)
+        self.assertEquals(self.game.halfmove_clock, 7)
+
+    def test_castling(self):
+        self.game.from_fen("r3k2r/8/8/8/8/8/8/R3K2R w Kq - 0 1")
+        self.assertEquals(self.white.castling[-1], (False, True))
+        self.assertEquals(self.black.castling[-1], (True, False))
+
+    def test_en_passant(self):
+        self.game.from_fen("8/8/8/3pP3/8/8/8/K6k w - d6 0 2")
+        pawn = self.game.board.piece_at((3, 4))
+        self.assertTrue(self.game.en_passant is pawn)
+        self.assertTrue(pawn.just_moved)
+
+    def test_missing_fields(self):
+        self.game.from_fen("8/8/8/8/8/8/8/K6k")
+        self.assertEquals(self.game.ply, 0)
+        self.assertEquals(self.white.castling[-1], (True, True))
+
+    def test_bad_piece(self):
+        self.assertRaises(ValueError, self.game.from_fen, "8/8/8/8/8/8/8/K6x")
+
+    def assertUnreadable(self, fen):
+        self.assertRaises(ValueError, self.game.from_fen, fen)
+
+    def test_long_rank(self):
+        self.assertUnreadable("8/8/8/8/8/8/8/K7k w - - 0 1")
+        self.assertUnreadable("8/8/8/8/8/8/8/K6k1 w - - 0 1")
+
+    def test_short_rank(self):
+        self.assertUnreadable("8/8/8/8/8/8/7/K6k w - - 0 1")
+
+    def test_rank_count(self):
+        self.assertUnreadable("8/8/8/8/8/8/K6k w - - 0 1")
+        self.assertUnreadable("8/8/8/8/8/8/8/8/K6k w - - 0 1")
+
+    def test_kings(self):
+        self.assertUnreadable("8/8/8/8/8/8/8/8 w - - 0 1")
+        self.assertUnreadable("8/8/8/8/8/8/8/K5kk w - - 0 1")
+
+    def test_side(self):
+        self.assertUnreadable("8/8/8/8/8/8/8/K6k x - - 0 1")
+
+    def test_castling(self):
+        self.assertUnreadable("8/8/8/8/8/8/8/K6k w KX - 0 1")
+
+    def test_en_passant_square(self):
+        self.assertUnreadable("8/8/8/8/8/8/8/K6k w - e 0 1")
+        self.assertUnreadable("8/8/8/8/8/8/8/K6k w - e3 0 1")
+        self.assertUnreadable("8/8/8/8/8/8/8/K6k b - i3 0 1")
+
+    def test_counters(self):
+        self.assertUnreadable("8/8/8/8/8/8/8/K6k w - - 0 0")
+        self.assertUnreadable("8/8/8/8/8/8/8/K6k w - - -1 1")
+        self.assertUnreadable("8/8/8/8/8/8/8/K6k w - - x 1")
+
+    def test_unreadable_keeps_position(self):
+        fen = self.game.to_fen()
+        self.assertUnreadable("8/8/8/8/8/8/8/8 w - - 0 1")
+        self.assertEquals(self.game.to_fen(), fen)
+
+    def test_round_trip(self):
+        for fen in ("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/"
+                "R3K2R w KQkq - 0 1",
+                "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+                "8/8/8/8/k2Pp2Q/8/8/3K4 b - d3 0 1"):
+            self.game.from_fen(fen)
+            self.assertEquals(self.game.to_fen(), fen)
+
+    def test_to_fen_after_moves(self):
+        self.game.from_fen(
+                "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1")
+        pawn = self.game.board.piece_at((4, 1))
+        self.game._make_move(Move(pawn, (4, 1), (4, 3)))
+        self.assertEquals(self.game.to_fen(), "rnbqkbnr/pppppppp/8/8/"
+                "4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 1")
+        knight = self.game.board.piece_at((6, 7))
+        self.game._make_move(Move(knight, (6, 7), (5, 5)))
+        self.assertEquals(self.game.to_fen(), "rnbqkb1r/pppppppp/5n2/8/"
+                "4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 1 2")
+
+    def test_reuses_players(self):
+        self.game.from_fen("8/8/8/8/8/8/8/K6k w - - 0 1")
+        self.game.from_fen("8/8/8/8/8/8/8/k6K w - - 0 1")
+        self.assertEquals(self.white.king.location, (7, 0))
+        self.assertEquals(len(self.white.pieces), 1)
+
+
+class EpdTest(ChessTest):
+    def test_operations(self):
+        operations = self.game.from_epd("8/8/8/8/8/8/8/K6k b - - "
+                'bm Kb1; id "test 1"; D1 3;')
+        self.assertEquals(operations,
+                {"bm": "Kb1", "id": "test 1", "D1": "3"})
+        self.assertEquals(self.game.current_player, self.black)
+
+    def test_counters(self):
+        self.game.from_epd("8/8/8/8/8/8/8/K6k w - - hmvc 4; fmvn 30;")
+        self.assertEquals(self.game.halfmove_clock, 4)
+        self.assertEquals(self.game.ply, 58)
+
+    def test_round_trip(self):
+        epd = 'r3k2r/8/8/8/8/8/8/R3K2R w Qk - D1 26; id "castles";'
+        operations = self.game.from_epd(epd)
+        self.assertEquals(self.game.to_epd(operations), epd)
+
+    def test_semicolon_in_quotes(self):
+        operations = self.game.from_epd('8/8/8/8/8/8/8/K6k w - - '
+                'c0 "a;b"; bm Kb1 Ka2; c1 "x"')
+        self.assertEquals(operations,
+                {"c0": "a;b", "bm": "Kb1 Ka2", "c1": "x"})
+        self.assertEquals(self.game.to_epd(operations), '8/8/8/8/8/8/8/K6k '
+                'w - - bm Kb1 Ka2; c0 "a;b"; c1 "x";')
+
+    def test_unterminated_quote(self):
+        self.assertRaises(ValueError, self.game.from_epd,
+                '8/8/8/8/8/8/8/K6k w - - id "open;')
+
+    def test_unwritable_operands(self):
+        self.game.from_epd("8/8/8/8/8/8/8/K6k w - -")
+        self.assertRaises(ValueError, self.game.to_epd, {"id": 'say "hi"'})
+        self.assertRaises(ValueError, self.game.to_epd, {"bm": "Kb1; Ka2"})
+
+
 class PerftTest(ChessTest):
     def setUp(self):
         super(PerftTest, self).setUp()
@@ -49,6 +181,40 @@ class PerftTest(ChessTest):
         self.game.divide(2)
         self.assertTrue(True)
 
+    def test_perft_stats(self):
+        self.assertEquals(self.game.perft_stats(2),
+                PerftStats(2039, 351, 1, 91, 0, 3, 0))
+
+    def test_perft_stats_mates(self):
+        self.game.from_fen(
+                "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1")
+        stats = self.game.perft_stats(3)
+        self.assertEquals((stats.nodes, stats.checks, stats.checkmates),
+                (8902, 12, 0))
+        self.game.from_fen("r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/"
+                "Pp1P2PP/R2Q1RK1 w kq - 0 1")
+        self.assertEquals(self.game.perft_stats(3),
+                PerftStats(9467, 1021, 4, 0, 120, 38, 22))
+
+    def test_promotions(self):
+        self.game.from_fen("r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/"
+                "Pp1P2PP/R2Q1RK1 w kq - 0 1")
+        self.assertEquals(self.game.perft_stats(2),
+                PerftStats(264, 87, 0, 6, 48, 10, 0))
+
+    def test_perft_table(self):
+        table = PerftTable(1)
+        self.assertEquals(2039, self.game.perft(2, table))
+        self.assertEquals(2039, self.game.perft(2, table))
+        self.assertTrue(table.hits > 0)
+
+    def test_transpositions(self):
+        # the rook endgame from the standard perft suite
+        self.game.from_fen("8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1")
+        for player in self.game.players:
+            player.castling.append((False, False))
+        self.assertEquals(43238, self.game.perft(4, PerftTable(1)))
+
 
 class MakeMoveTest(ChessTest):
     def test_en_passant(self):
@@ -267,5 +433,175 @@ class CheckmateTest(ChessTest):
         self.assertTrue(self.game.is_checkmate(self.white))
 
 
+class LegalMovesTest(ChessTest):
+    def setUp(self):
+        super(LegalMovesTest, self).setUp()
+        self.white.castling.append((False, False))
+        self.black.castling.append((False, False))
+        self.king = King(self.white, (4, 0))
+        self.board.add_piece(self.king)
+
+    def assertSameMoves(self):
+        """Check legal_moves agrees with filtering through is_legal."""
+        expected = [move for move in self.white.moves(self.board)
+                if self.game.is_legal(move)]
+        self.assertEquals(sorted(self.game.legal_moves()), sorted(expected))
+
+    def test_pinned_piece_stays_on_line(self):
+        bishop = Bishop(self.white, (4, 1))
+        self.board.add_piece(bishop)
+        self.board.add_piece(Rook(self.black, (4, 7)))
+        self.assertFalse(any(move.piece is bishop
+                for move in self.game.legal_moves()))
+        self.assertSameMoves()
+
+    def test_pinned_rook_can_take_pinner(self):
+        rook = Rook(self.white, (4, 1))
+        self.board.add_piece(rook)
+        self.board.add_piece(Queen(self.black, (4, 5)))
+        targets = [move.to for move in self.game.legal_moves()
+                if move.piece is rook]
+        self.assertEquals(sorted(targets),
+                [(4, 2), (4, 3), (4, 4), (4, 5)])
+
+    def test_block_check(self):
+        self.board.add_piece(Rook(self.black, (0, 0)))
+        knight = Knight(self.white, (1, 2))
+        self.board.add_piece(knight)
+        targets = [move.to for move in self.game.legal_moves()
+                if move.piece is knight]
+        self.assertEquals(sorted(targets), [(0, 0), (2, 0)])
+        self.assertSameMoves()
+
+    def test_double_check_moves_king(self):
+        self.board.add_piece(Rook(self.black, (4, 7)))
+        self.board.add_piece(Knight(self.black, (3, 2)))
+        self.board.add_piece(Queen(self.white, (3, 3)))
+        self.assertTrue(all(move.piece is self.king
+                for move in self.game.legal_moves()))
+        self.assertSameMoves()
+
+    def test_king_cant_retreat_along_check(self):
+        self.board.add_piece(Rook(self.black, (7, 0)))
+        self.assertFalse((3, 0) in
+                [move.to for move in self.game.legal_moves()])
+
+    def test_en_passant_discovered_check(self):
+        self.board.remove_piece(self.king)
+        self.board.add_piece(King(self.white, (0, 4)))
+        pawn = Pawn(self.white, (1, 4))
+        self.board.add_piece(pawn)
+        self.board.add_piece(Rook(self.black, (7, 4)))
+        black = Pawn(self.black, (2, 6))
+        self.board.add_piece(black)
+        self.game.ply = 1
+        self.game._make_move(Move(black, (2, 6), (2, 4)))
+        self.assertFalse(any(move.captured is black
+                for move in self.game.legal_moves()))
+
+    def test_en_passant_target(self):
+        pawn = Pawn(self.white, (1, 4))
+        self.board.add_piece(pawn)
+        black = Pawn(self.black, (2, 6))
+        self.board.add_piece(black)
+        self.game.ply = 1
+        self.game._make_move(Move(black, (2, 6), (2, 4)))
+        moves = [move for move in self.game.legal_moves()
+                if move.captured is black]
+        self.assertEquals([move.to for move in moves], [(2, 5)])
+        self.game._make_move(moves[0])
+        self.assertEquals(self.board.piece_at((2, 4)), None)
+        self.game._undo_move()
+        self.assertEquals(self.board.piece_at((2, 4)), black)
+
+
+class CastlingTest(ChessTest):
+    def setUp(self):
+        super(CastlingTest, self).setUp()
+        self.king = King(self.white, (4, 0))
+        self.board.add_piece(self.king)
+        self.black.castling.append((False, False))
+
+    def castles(self):
+        return sorted(move.to for move in self.game.legal_moves()
+                if move.piece is self.king and
+                abs(move.to[0] - move.start[0]) == 2)
+
+    def test_needs_rook(self):
+        self.board.add_piece(Rook(self.white, (7, 0)))
+        self.assertEquals(self.castles(), [(6, 0)])
+
+    def test_queenside_needs_empty_b_file(self):
+        self.board.add_piece(Rook(self.white, (0, 0)))
+        self.board.add_piece(Knight(self.white, (1, 0)))
+        self.assertEquals(self.castles(), [])
+
+    def test_rook_capture_loses_rights(self):
+        rook = Rook(self.white, (7, 0))
+        self.board.add_piece(rook)
+        bishop = Bishop(self.black, (5, 2))
+        self.board.add_piece(bishop)
+        self.game.ply = 1
+        self.game._make_move(Move(bishop, (5, 2), (7, 0), rook))
+        self.assertFalse(self.white.can_castle_kingside)
+        self.game._undo_move()
+        self.assertTrue(self.white.can_castle_kingside)
+
+
+class StateTest(ChessTest):
+    def setUp(self):
+        super(StateTest, self).setUp()
+        self.king = King(self.white, (4, 0))
+        self.rook = Rook(self.white, (7, 0))
+        self.board.add_piece(self.king)
+        self.board.add_piece(self.rook)
+
+    def test_quiet_move_keeps_castling_list(self):
+        knight = Knight(self.white, (1, 0))
+        self.board.add_piece(knight)
+        self.game._make_move(Move(knight, (1, 0), (2, 2)))
+        self.assertEquals(self.white.castling, [(True, True)])
+
+    def test_rook_move_then_undo(self):
+        self.game._make_move(Move(self.rook, (7, 0), (7, 3)))
+        self.assertEquals(self.white.castling[-1], (True, False))
+        self.game._undo_move()
+        self.assertEquals(self.white.castling, [(True, True)])
+
+    def test_undo_castle_restores_rook(self):
+        self.game._make_move(Move(self.king, (4, 0), (6, 0)))
+        self.assertEquals(self.board.piece_at((5, 0)), self.rook)
+        self.game._undo_move()
+        self.assertTrue(self.board.piece_at((7, 0)) is self.rook)
+        self.assertEquals(self.white.castling, [(True, True)])
+
+    def test_undo_promotion_restores_same_pawn(self):
+        pawn = Pawn(self.white, (0, 6))
+        self.board.add_piece(pawn)
+        self.game._make_move(Move(pawn, (0, 6), (0, 7), None, Queen))
+        self.game._undo_move()
+        self.assertTrue(self.board.piece_at((0, 6)) is pawn)
+        self.assertEquals(self.board.piece_at((0, 7)), None)
+
+    def test_halfmove_clock(self):
+        pawn = Pawn(self.white, (0, 1))
+        self.board.add_piece(pawn)
+        self.game._make_move(Move(self.rook, (7, 0), (7, 3)))
+        self.game._make_move(Move(self.rook, (7, 3), (7, 4)))
+        self.assertEquals(self.game.halfmove_clock, 2)
+        self.game._make_move(Move(pawn, (0, 1), (0, 2)))
+        self.assertEquals(self.game.halfmove_clock, 0)
+        self.game._undo_move()
+        self.assertEquals(self.game.halfmove_clock, 2)
+
+    def test_undo_restores_hash(self):
+        key = self.game.hash
+        self.game._make_move(Move(self.rook, (7, 0), (7, 3)))
+        self.assertNotEquals(self.game.hash, key)
+        self.game._undo_move()
+        self.assertEquals(self.game.hash, key)
+        self.assertEquals(self.game.states, [])
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,117 @@
+import unittest
+
+from board import Board
+from color import Color
+from move import Move, encode, decode, encode_all, coordinates, start_of, target_of, \
+        kind_of, QUIET, DOUBLE_PUSH, KING_CASTLE, QUEEN_CASTLE, CAPTURE, \
+        EN_PASSANT, PROMOTION
+from player import Player
+from game import Game
+import move
+from piece import King, Knight, Rook, Bishop, Queen, Pawn, PIECE_TYPES
+
+
+class ChessTest(unittest.TestCase):
+    def setUp(self):
+        self.board = Board(dict())
+        self.white = Player(Color.WHITE)
+        self.black = Player(Color.BLACK)
+        self.white.opponent, self.black.opponent = self.black, self.white
+        self.game = Game(self.board, (self.white, self.black))
+
+
+class EncodeTest(ChessTest):
+    def test_squares(self):
+        knight = Knight(self.white, (1, 0))
+        code = encode(Move(knight, (1, 0), (2, 2)))
+        self.assertEquals(start_of(code), (1, 0))
+        self.assertEquals(target_of(code), (2, 2))
+        self.assertEquals(kind_of(code), QUIET)
+
+    def test_double_push(self):
+        pawn = Pawn(self.white, (4, 1))
+        self.assertEquals(kind_of(encode(Move(pawn, (4, 1), (4, 3)))),
+                DOUBLE_PUSH)
+
+    def test_castles(self):
+        king = King(self.white, (4, 0))
+        self.assertEquals(kind_of(encode(Move(king, (4, 0), (6, 0)))),
+                KING_CASTLE)
+        self.assertEquals(kind_of(encode(Move(king, (4, 0), (2, 0)))),
+                QUEEN_CASTLE)
+
+    def test_rook_two_squares_is_quiet(self):
+        rook = Rook(self.white, (0, 0))
+        self.assertEquals(kind_of(encode(Move(rook, (0, 0), (2, 0)))), QUIET)
+
+    def test_type_codes(self):
+        self.assertEquals(PIECE_TYPES[move._PAWN], Pawn)
+        self.assertEquals(PIECE_TYPES[move._KING], King)
+
+    def test_en_passant(self):
+        pawn = Pawn(self.white, (4, 4))
+        taken = Pawn(self.black, (3, 4))
+        self.assertEquals(kind_of(encode(Move(pawn, (4, 4), (3, 5), taken))),
+                EN_PASSANT)
+
+    def test_distinct_promotions(self):
+        pawn = Pawn(self.white, (0, 6))
+        codes = set(encode(Move(pawn, (0, 6), (0, 7), None, promotion))
+                for promotion in Pawn.promotable)
+        self.assertEquals(len(codes), 4)
+
+    def test_capture_promotion(self):
+        pawn = Pawn(self.white, (7, 6))
+        rook = Rook(self.black, (6, 7))
+        code = encode(Move(pawn, (7, 6), (6, 7), rook, Queen))
+        self.assertEquals(kind_of(code), CAPTURE | PROMOTION | 3)
+        self.assertTrue(code < 1 << 16)
+
+    def test_encode_all(self):
+        king = King(self.white, (4, 4))
+        self.board.add_piece(king)
+        moves = list(king.moves(self.board))
+        codes = encode_all(moves)
+        self.assertEquals(codes.typecode, 'H')
+        self.assertEquals(list(codes), [encode(move) for move in moves])
+
+
+class CoordinatesTest(ChessTest):
+    def test_quiet(self):
+        knight = Knight(self.white, (6, 0))
+        self.assertEquals(coordinates(Move(knight, (6, 0), (5, 2))), "g1f3")
+
+    def test_promotion(self):
+        pawn = Pawn(self.black, (0, 1))
+        self.assertEquals(
+                coordinates(Move(pawn, (0, 1), (0, 0), None, Knight)), "a2a1n")
+
+
+class DecodeTest(ChessTest):
+    def test_round_trip_legal_moves(self):
+        self.game.from_fen("r3k2r/p1ppqpb1/bn2pnp1/3PN3/"
+                "1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1")
+        board = self.game.board
+        for move in self.game.legal_moves():
+            self.assertEquals(decode(encode(move), board), move)
+
+    def test_round_trip_en_passant(self):
+        pawn = Pawn(self.white, (4, 4))
+        taken = Pawn(self.black, (3, 4))
+        self.board.add_piece(pawn)
+        self.board.add_piece(taken)
+        move = Move(pawn, (4, 4), (3, 5), taken)
+        self.assertEquals(decode(encode(move), self.board), move)
+
+    def test_round_trip_promotion(self):
+        pawn = Pawn(self.black, (2, 1))
+        bishop = Bishop(self.white, (1, 0))
+        self.board.add_piece(pawn)
+        self.board.add_piece(bishop)
+        for promotion in Pawn.promotable:
+            move = Move(pawn, (2, 1), (1, 0), bishop, promotion)
+            self.assertEquals(decode(encode(move), self.board), move)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,90 +1,123 @@
 import unittest
 
 from board import Board
-from color import Color
-from move import Move
-from move_parser import MoveParser
-from player import Player
-from piece import King, Knight, Rook, Bishop, Queen, Pawn
+from game import new_game
+from move import decode
+from move_parser import MoveParser, move_index
+from piece import King, Knight, Rook, Queen, Pawn
 
+START = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq -"
 
-class ParseMoveTest(unittest.TestCase):
+
+class ParseTest(unittest.TestCase):
     def setUp(self):
-        self.white = Player(Color.WHITE)
         self.move_parser = MoveParser()
-        self.board = Board(set())
-
-    def test_parse_square_a1(self):
-        """Ensure a1 is correctly parsed as (0, 0)."""
-        self.assertEquals((0, 0), self.move_parser._parse_square('a1'))
-
-    def test_parse_square_h8(self):
-        """Ensure a1 is correctly parsed as (7, 7)."""
-        self.assertEquals((7, 7), self.move_parser._parse_square('h8'))
-
-    def test_parse_move_no_piece(self):
-        """Ensure a move with no piece can be parsed."""
-        expected = Move(None, (7, 6), (7, 7))
-        got = self.move_parser.parse_move('h7 h8', self.board)
-        self.assertEquals(got, expected)
-
-    def test_parse_move_piece(self):
-        """Ensure a move with a piece can be parsed."""
-        king = King(self.white, (4, 4))
-        self.board.add_piece(king)
-        expected = Move(king, (4, 4), (5, 5))
-        got = self.move_parser.parse_move('e5 f6', self.board)
-        self.assertEquals(got, expected)
-
-    def test_one_squares(self):
-        """Ensure supplying one square raises a ValueError."""
-        self.assertRaises(ValueError, self.move_parser.parse_move,
-                'e4', self.board)
-
-    def test_bad_squares(self):
-        """Ensure supplying bad square raises a ValueError."""
-        self.assertRaises(ValueError, self.move_parser.parse_move,
-                'e4 h9', self.board)
-
-    def test_parse_move_promotion_queen(self):
-        """Ensure queen promotion is valid."""
-        pawn = Pawn(self.white, (0, 6))
-        self.board.add_piece(pawn)
-        expected = Move(pawn, (0, 6), (0, 7), None, Queen)
-        got = self.move_parser.parse_move('a7 a8 Q', self.board)
-        self.assertEquals(got, expected)
-
-    def test_parse_move_promotion_knight(self):
-        """Ensure knight promotion is valid."""
-        pawn = Pawn(self.white, (0, 6))
-        self.board.add_piece(pawn)
-        expected = Move(pawn, (0, 6), (0, 7), None, Knight)
-        got = self.move_parser.parse_move('a7 a8 N', self.board)
-        self.assertEquals(got, expected)
-
-    def test_parse_move_promotion_bishop(self):
-        """Ensure bishop promotion is valid."""
-        pawn = Pawn(self.white, (0, 6))
-        self.board.add_piece(pawn)
-        expected = Move(pawn, (0, 6), (0, 7), None, Bishop)
-        got = self.move_parser.parse_move('a7 a8 B', self.board)
-        self.assertEquals(got, expected)
-
-    def test_parse_move_promotion_rook(self):
-        """Ensure rook promotion is valid."""
-        pawn = Pawn(self.white, (0, 6))
-        self.board.add_piece(pawn)
-        expected = Move(pawn, (0, 6), (0, 7), None, Rook)
-        got = self.move_parser.parse_move('a7 a8 R', self.board)
-        self.assertEquals(got, expected)
-
-    def test_parse_move_promotion_bad(self):
-        """Ensure an invalid promotion raises a ValueError."""
-        pawn = Pawn(self.white, (0, 6))
-        self.board.add_piece(pawn)
-        self.assertRaises(ValueError, self.move_parser.parse_move, 
-                'a7 a8 K', self.board)
 
+    def parse(self, san, fen):
+        move = self.move_parser.parse(san, new_game(Board(), fen))
+        return type(move.piece), move.start, move.to, move.promotion
+
+    def test_pawn_push(self):
+        self.assertEquals(self.parse("e4", START),
+                (Pawn, (4, 1), (4, 3), None))
+
+    def test_knight(self):
+        self.assertEquals(self.parse("Nf3+", START),
+                (Knight, (6, 0), (5, 2), None))
+
+    def test_file_disambiguation(self):
+        fen = "4k3/8/8/8/8/8/4K3/R6R w - -"
+        self.assertEquals(self.parse("Rad1", fen),
+                (Rook, (0, 0), (3, 0), None))
+        self.assertEquals(self.parse("Rhd1", fen),
+                (Rook, (7, 0), (3, 0), None))
+
+    def test_rank_disambiguation(self):
+        self.assertEquals(self.parse("R1a3", "4k3/8/8/8/R7/8/8/R3K3 w - -"),
+                (Rook, (0, 0), (0, 2), None))
+
+    def test_ambiguous(self):
+        self.assertRaises(ValueError, self.parse, "Rd1",
+                "4k3/8/8/8/8/8/4K3/R6R w - -")
+
+    def test_pawn_capture(self):
+        self.assertEquals(self.parse("exd5",
+                "4k3/8/8/3p4/4P3/8/8/4K3 w - -"),
+                (Pawn, (4, 3), (3, 4), None))
+
+    def test_promotion(self):
+        self.assertEquals(self.parse("b8=N", "4k3/1P6/8/8/8/8/8/4K3 w - -"),
+                (Pawn, (1, 6), (1, 7), Knight))
+
+    def test_castling(self):
+        fen = "r3k2r/8/8/8/8/8/8/R3K2R b KQkq -"
+        self.assertEquals(self.parse("O-O", fen), (King, (4, 7), (6, 7), None))
+        self.assertEquals(self.parse("O-O-O", fen),
+                (King, (4, 7), (2, 7), None))
+
+    def test_illegal(self):
+        self.assertRaises(ValueError, self.parse, "Ke3", START)
+
+    def test_unreadable(self):
+        self.assertRaises(ValueError, self.parse, "e9", START)
+
+    def test_uci(self):
+        fen = "4k3/1P6/8/8/8/8/8/4K3 w - -"
+        self.assertEquals(self.parse("b7b8r", fen),
+                (Pawn, (1, 6), (1, 7), Rook))
+        self.assertEquals(self.parse("e1d1", fen),
+                (King, (4, 0), (3, 0), None))
+
+    def test_typed_squares(self):
+        fen = "4k3/1P6/8/8/8/8/8/4K3 w - -"
+        self.assertEquals(self.parse("b7 b8 Queen", fen),
+                (Pawn, (1, 6), (1, 7), Queen))
+        self.assertEquals(self.parse("e1-d1", fen),
+                (King, (4, 0), (3, 0), None))
+
+    def test_uci_castling(self):
+        fen = "r3k2r/8/8/8/8/8/8/R3K2R b KQkq -"
+        self.assertEquals(self.parse("e8c8", fen),
+                (King, (4, 7), (2, 7), None))
+
+    def test_lenient_san(self):
+        fen = "4k3/8/8/3p4/4P3/2N5/8/4K3 w - -"
+        for san in ("Nxd5", "Nd5", "Ncd5", "Nc3xd5", "Nc3d5"):
+            self.assertEquals(self.parse(san, fen),
+                    (Knight, (2, 2), (3, 4), None))
+
+    def test_illegal_coordinates(self):
+        self.assertRaises(ValueError, self.parse, "e2e5",
+                START)
+
+    def test_en_passant(self):
+        game = new_game(Board(), "4k3/8/8/3pP3/8/8/8/4K3 w - d6")
+        move = self.move_parser.parse("exd6", game)
+        self.assertEquals(move.captured, game.board.piece_at((3, 4)))
+
+
+class MoveIndexTest(unittest.TestCase):
+    def test_start_position(self):
+        game = new_game(Board(), START)
+        index = move_index(game.legal_moves())
+        self.assertEquals(len(set(index.values())), 20)
+        self.assertEquals(decode(index["Nf3"], game.board).to, (5, 2))
+
+    def test_ambiguous_left_out(self):
+        game = new_game(Board(), "4k3/8/8/8/8/8/4K3/R6R w - -")
+        index = move_index(game.legal_moves())
+        self.assertFalse("Rd1" in index)
+        self.assertTrue("Rad1" in index)
+        self.assertTrue("Rhd1" in index)
+
+    def test_index_kept_by_hash(self):
+        parser = MoveParser()
+        game = new_game(Board(), START)
+        index = parser.index(game)
+        parser.parse("e4", game)
+        self.assertTrue(parser.index(game) is index)
+        game._make_move(parser.parse("e4", game))
+        self.assertFalse(parser.index(game) is index)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,86 @@
+import unittest
+
+from color import Color
+from move import Move, encode
+from ordering import MoveOrderer
+from player import Player, CPU
+from piece import Knight, Rook, Queen, Pawn
+
+
+class OrderingTest(unittest.TestCase):
+    def setUp(self):
+        self.white = Player(Color.WHITE)
+        self.black = Player(Color.BLACK)
+        self.orderer = MoveOrderer(CPU.RELATIVE_VALUE)
+        self.pawn = Pawn(self.white, (3, 3))
+        self.queen = Queen(self.white, (0, 0))
+        self.rook = Rook(self.black, (4, 4))
+        self.knight = Knight(self.black, (0, 4))
+
+    def test_most_valuable_victim_first(self):
+        small = Move(self.queen, (0, 0), (0, 4), self.knight)
+        big = Move(self.pawn, (3, 3), (4, 4), self.rook)
+        self.assertEquals(self.orderer.order([small, big], 0), [big, small])
+
+    def test_least_valuable_attacker_first(self):
+        by_queen = Move(self.queen, (0, 0), (4, 4), self.rook)
+        by_pawn = Move(self.pawn, (3, 3), (4, 4), self.rook)
+        self.assertEquals(self.orderer.order([by_queen, by_pawn], 0),
+                [by_pawn, by_queen])
+
+    def test_captures_before_quiet_moves(self):
+        quiet = Move(self.queen, (0, 0), (1, 1))
+        capture = Move(self.queen, (0, 0), (0, 4), self.knight)
+        self.assertEquals(self.orderer.order([quiet, capture], 0),
+                [capture, quiet])
+
+    def test_best_move_first(self):
+        quiet = Move(self.queen, (0, 0), (1, 1))
+        capture = Move(self.queen, (0, 0), (0, 4), self.knight)
+        self.assertEquals(
+                self.orderer.order([capture, quiet], 0, encode(quiet)),
+                [quiet, capture])
+
+    def test_killer_before_other_quiet_moves(self):
+        first = Move(self.queen, (0, 0), (1, 1))
+        second = Move(self.queen, (0, 0), (2, 2))
+        self.orderer.cutoff(second, 3, 1, 1)
+        self.assertEquals(self.orderer.order([first, second], 3),
+                [second, first])
+
+    def test_two_killers_per_ply(self):
+        moves = [Move(self.queen, (0, 0), (i, i)) for i in (1, 2, 3)]
+        for move in moves:
+            self.orderer.cutoff(move, 0, 1, 0)
+        self.assertEquals(self.orderer.killers[0],
+                [encode(moves[2]), encode(moves[1])])
+
+    def test_captures_are_not_killers(self):
+        capture = Move(self.queen, (0, 0), (0, 4), self.knight)
+        self.orderer.cutoff(capture, 0, 1, 0)
+        self.assertEquals(self.orderer.killers, [])
+
+    def test_history(self):
+        first = Move(self.queen, (0, 0), (1, 1))
+        second = Move(self.queen, (0, 0), (2, 2))
+        self.orderer.cutoff(second, 5, 3, 1)
+        self.assertEquals(self.orderer.order([first, second], 0),
+                [second, first])
+
+    def test_first_move_cutoff_rate(self):
+        move = Move(self.queen, (0, 0), (1, 1))
+        self.orderer.cutoff(move, 0, 1, 0)
+        self.orderer.cutoff(move, 0, 1, 2)
+        self.assertEquals(self.orderer.first_move_cutoff_rate, 0.5)
+
+    def test_new_search(self):
+        move = Move(self.queen, (0, 0), (1, 1))
+        self.orderer.cutoff(move, 0, 2, 0)
+        self.orderer.new_search()
+        self.assertEquals(self.orderer.killers, [])
+        self.assertEquals(self.orderer.history.values(), [2])
+        self.assertEquals(self.orderer.cutoffs, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
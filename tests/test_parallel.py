@@ -0,0 +1,37 @@
+import unittest
+
+from bitboard import BitBoard
+import parallel
+
+KIWIPETE = "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"
+
+
+class PerftTest(unittest.TestCase):
+    def test_root_split(self):
+        counts, rate = parallel.perft(KIWIPETE, 2, processes=2)
+        self.assertEquals(len(counts), 48)
+        self.assertEquals(sum(counts.values()), 2039)
+        self.assertEquals(counts["e1g1"], 43)
+        self.assertTrue(rate > 0)
+
+    def test_second_level_split(self):
+        counts, _ = parallel.perft(KIWIPETE, 2, processes=2, split=2)
+        self.assertEquals(sum(counts.values()), 2039)
+
+    def test_en_passant_from_fen(self):
+        counts, _ = parallel.perft("8/8/8/8/k2Pp2Q/8/8/3K4 b - d3 0 1", 2,
+                processes=2, backend=BitBoard)
+        self.assertEquals(sum(counts.values()), 136)
+        # taking en passant would expose the king along the rank
+        self.assertFalse("e4d3" in counts)
+
+    def test_split_below_one(self):
+        self.assertRaises(ValueError, parallel.perft, KIWIPETE, 2, split=0)
+
+    def test_depth_one(self):
+        counts, _ = parallel.perft(KIWIPETE, 1)
+        self.assertEquals(sum(counts.values()), 48)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import unittest
+
+import pgn
+
+GAMES = """[Event "Ruy Lopez"]
+[Result "1-0"]
+
+1. e4 e5 2. Nf3 {main line} Nc6 (2... d6 3. d4) 3. Bb5 a6 $1 4. Ba4 Nf6
+5. O-O Be7 1-0
+
+[Event "Illegal"]
+
+1. e4 e5 2. Ke3 1-0
+
+[Event "Promotion"]
+[FEN "8/P7/8/8/8/8/8/k3K3 w - - 0 1"]
+
+1. a8=Q+ Kb1 *
+""".splitlines(True)
+
+
+class SplitTest(unittest.TestCase):
+    def test_split_games(self):
+        chunks = list(pgn.split_games(GAMES))
+        self.assertEquals(len(chunks), 3)
+        self.assertTrue(chunks[1].startswith('[Event "Illegal"]'))
+
+    def test_escaped_lines(self):
+        chunks = list(pgn.split_games(["% generated\n"] + GAMES))
+        self.assertEquals(len(chunks), 3)
+
+
+class ParseTest(unittest.TestCase):
+    def test_headers(self):
+        headers, _ = pgn.parse("".join(GAMES[:6]))
+        self.assertEquals(headers, {"Event": "Ruy Lopez", "Result": "1-0"})
+
+    def test_main_line_only(self):
+        _, moves = pgn.parse("".join(GAMES[:6]))
+        self.assertEquals(moves, ["e4", "e5", "Nf3", "Nc6", "Bb5", "a6",
+                "Ba4", "Nf6", "O-O", "Be7"])
+
+    def test_nested_variation(self):
+        _, moves = pgn.parse("1. e4 (1. d4 (1. c4) d5) e5 *")
+        self.assertEquals(moves, ["e4", "e5"])
+
+    def test_black_move_number(self):
+        _, moves = pgn.parse("12... Qxd4 13.Nxd4 *")
+        self.assertEquals(moves, ["Qxd4", "Nxd4"])
+
+
+class ReplayTest(unittest.TestCase):
+    def test_replay(self):
+        record = pgn.replay("".join(GAMES[:6]))
+        self.assertEquals(record.moves[-2:], ["e1g1", "f8e7"])
+        self.assertEquals(record.fen, "r1bqk2r/1pppbppp/p1n2n2/4p3/"
+                "B3P3/5N2/PPPP1PPP/RNBQ1RK1 w kq - 4 6")
+        self.assertEquals(record.positions, None)
+
+    def test_illegal_move(self):
+        self.assertEquals(pgn.replay("1. e4 e5 2. Ke3 1-0"), None)
+
+    def test_unreadable_move(self):
+        self.assertEquals(pgn.replay("1. e4 zz9 *"), None)
+
+    def test_malformed_fen(self):
+        for fen in ("8/8/8/8/8/8/8/8 w - - 0 1", "4k3/8/8/8/8/8/8/4K3 w - e"):
+            self.assertEquals(pgn.replay('[FEN "%s"]\n\n*\n' % fen), None)
+
+    def test_positions(self):
+        record = pgn.replay("1. e4 e5 *", positions=True)
+        self.assertEquals(record.positions, [pgn.START,
+                "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 1"])
+
+    def test_replay_all(self):
+        records = list(pgn.replay_all(GAMES, processes=2, ahead=2))
+        self.assertEquals([r.headers["Event"] for r in records],
+                ["Ruy Lopez", "Promotion"])
+        self.assertEquals(records[1].moves, ["a7a8q", "a1b1"])
+
+    def test_bounded_read_ahead(self):
+        read = []
+
+        def endless():
+            while True:
+                read.append(True)
+                yield '[Event "Scholar"]\n'
+                yield "\n"
+                yield "1. e4 e5 2. Bc4 Nc6 3. Qh5 Nf6 4. Qxf7# 1-0\n"
+                yield "\n"
+
+        records = pgn.replay_all(endless(), processes=2, ahead=4)
+        for _ in xrange(3):
+            self.assertEquals(next(records).headers["Event"], "Scholar")
+        records.close()
+        # the records taken, the games in flight and the one being cut
+        self.assertTrue(len(read) <= 3 + 4 + 2)
+
+    def test_malformed_game_in_stream(self):
+        games = GAMES[:6] + ['[FEN "8/8/8/8/8/8/8/8 w - - 0 1"]\n', "\n",
+                "1. Ka1 *\n", "\n"] + GAMES[10:]
+        records = list(pgn.replay_all(games, processes=2))
+        self.assertEquals([r.headers["Event"] for r in records],
+                ["Ruy Lopez", "Promotion"])
+
+    def test_rate(self):
+        count, skipped, per_second = pgn.rate(GAMES, processes=2)
+        self.assertEquals((count, skipped), (2, 1))
+        self.assertTrue(per_second > 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -121,6 +121,22 @@ class PawnTest(ChessTest):
         self.assertTrue(all(move.promotion is not None for move in moves))
 
 
+class SlotsTest(ChessTest):
+    def test_pieces_have_no_dict(self):
+        for piece_type in (Pawn, Knight, Bishop, Rook, Queen, King):
+            piece = piece_type(self.white, (0, 0))
+            self.assertFalse(hasattr(piece, "__dict__"))
+
+    def test_black_pawn_constants(self):
+        pawn = Pawn(self.black, (3, 6))
+        self.assertEquals((pawn.promotion_rank, pawn.start_rank,
+                pawn._vector), (0, 6, -1))
+
+    def test_equal_pieces_hash_equal(self):
+        self.assertEquals(hash(Rook(self.white, (2, 3))),
+                hash(Rook(self.white, (2, 3))))
+
+
 class KingTest(ChessTest):
     def test_castle(self):
         rook1 = Rook(self.white, (0, 0))
@@ -144,6 +160,16 @@ class KingTest(ChessTest):
         move = Move(king, king.location, (2, 0))
         self.assertFalse(self.game.is_legal(move))
 
+    def test_castle_through_pawn_attack(self):
+        king = King(self.white, (4, 0))
+        rook = Rook(self.white, (7, 0))
+        pawn = Pawn(self.black, (4, 1))
+        self.board.add_piece(king)
+        self.board.add_piece(rook)
+        self.board.add_piece(pawn)
+        move = Move(king, king.location, (6, 0))
+        self.assertFalse(self.game.is_legal(move))
+
     def test_cant_castle_out_of_check(self):
         king = King(self.white, (4, 0))
         rook1 = Rook(self.white, (0, 0))
@@ -1,9 +1,13 @@
+import threading
+import time
 import unittest
 
 from board import Board
 from color import Color
 from move import Move
-from player import Player
+import parallel
+from player import Player, CPU
+from transposition import SharedTranspositionTable
 from game import Game
 from piece import King, Knight, Rook, Bishop, Queen, Pawn
 
@@ -38,5 +42,244 @@ class InCheckTest(ChessTest):
         self.assertTrue(self.white.is_in_check(self.board))
 
 
+class KingTest(ChessTest):
+    def test_no_king(self):
+        self.assertEquals(self.white.king, None)
+
+    def test_tracks_king(self):
+        king = King(self.white, (4, 0))
+        self.board.add_piece(king)
+        self.board.move_piece(king, (4, 1))
+        self.assertTrue(self.white.king is king)
+        self.assertEquals(self.black.king, None)
+
+    def test_removed_king(self):
+        king = King(self.white, (4, 0))
+        self.board.add_piece(king)
+        self.board.remove_piece(king)
+        self.assertEquals(self.white.king, None)
+
+
+class CPUTest(unittest.TestCase):
+    def setUp(self):
+        self.board = Board(dict())
+        self.white = CPU(Color.WHITE)
+        self.black = CPU(Color.BLACK)
+        self.white.opponent, self.black.opponent = self.black, self.white
+        self.game = Game(self.board, (self.white, self.black))
+        self.board.add_piece(King(self.white, (4, 0)))
+        self.board.add_piece(Rook(self.white, (0, 3)))
+        self.board.add_piece(King(self.black, (4, 7)))
+        self.board.add_piece(Knight(self.black, (0, 7)))
+        self.white.castling.append((False, False))
+        self.black.castling.append((False, False))
+
+    def test_takes_hanging_piece(self):
+        move = self.white.get_move(self.game)
+        self.assertEquals(move.to, (0, 7))
+
+    def test_search_fills_table(self):
+        self.white.get_move(self.game)
+        self.assertTrue(self.white.table.hits > 0)
+
+    def test_table_saves_nodes(self):
+        self.white.get_move(self.game)
+        first = self.white.nodes
+        self.white.nodes = 0
+        self.white.get_move(self.game)
+        self.assertTrue(self.white.nodes < first)
+
+    def test_cutoff_counters(self):
+        self.white.get_move(self.game)
+        self.assertTrue(self.white.orderer.cutoffs > 0)
+        self.assertTrue(0 < self.white.orderer.first_move_cutoff_rate <= 1)
+
+    def test_depth_cap(self):
+        self.white.get_move(self.game, depth=2)
+        self.assertEquals(self.white.completed_depth, 2)
+
+    def test_node_limit(self):
+        move = self.white.get_move(self.game, depth=10, node_limit=50)
+        self.assertTrue(self.white.nodes <= 50)
+        self.assertTrue(self.game.is_legal(move))
+
+    def test_time_limit(self):
+        start = time.time()
+        move = self.white.get_move(self.game, depth=50, time_limit=0.2)
+        self.assertTrue(time.time() - start < 1)
+        self.assertTrue(self.white.completed_depth < 50)
+        self.assertTrue(self.game.is_legal(move))
+
+    def test_zero_time_limit(self):
+        self.white.time_limit = 10
+        start = time.time()
+        move = self.white.get_move(self.game, depth=50, time_limit=0)
+        self.assertTrue(time.time() - start < 1)
+        self.assertEquals(self.white.completed_depth, 0)
+        self.assertTrue(self.game.is_legal(move))
+
+    def test_zero_node_limit(self):
+        self.white.get_move(self.game, depth=50, node_limit=0)
+        self.assertEquals(self.white.completed_depth, 0)
+
+    def test_stop(self):
+        self.white.stop()
+        move = self.white.get_move(self.game, depth=10)
+        self.assertEquals(self.white.completed_depth, 0)
+        self.assertTrue(self.game.is_legal(move))
+
+    def test_stop_from_thread(self):
+        timer = threading.Timer(0.2, self.white.stop)
+        timer.start()
+        start = time.time()
+        self.white.get_move(self.game, depth=50)
+        timer.join()
+        self.assertTrue(time.time() - start < 1)
+        self.assertTrue(self.white.completed_depth < 50)
+
+    def test_aborted_search_restores_board(self):
+        key = self.game.hash
+        self.white.get_move(self.game, depth=10, node_limit=100)
+        self.assertEquals(self.game.hash, key)
+
+    def test_board_restored(self):
+        key = self.game.hash
+        self.white.get_move(self.game)
+        self.assertEquals(self.game.hash, key)
+
+
+class MateTest(unittest.TestCase):
+    def setUp(self):
+        self.board = Board(dict())
+        self.white = CPU(Color.WHITE)
+        self.black = CPU(Color.BLACK)
+        self.white.opponent, self.black.opponent = self.black, self.white
+        self.game = Game(self.board, (self.white, self.black))
+        self.board.add_piece(King(self.white, (4, 0)))
+        self.board.add_piece(Rook(self.white, (0, 3)))
+        self.board.add_piece(King(self.black, (6, 7)))
+        for x in (5, 6, 7):
+            self.board.add_piece(Pawn(self.black, (x, 6)))
+        self.white.castling.append((False, False))
+        self.black.castling.append((False, False))
+
+    def test_finds_back_rank_mate(self):
+        move = self.white.get_move(self.game, depth=2)
+        self.assertEquals(move.to, (0, 7))
+
+
+class QuiescenceTest(unittest.TestCase):
+    def setUp(self):
+        self.board = Board(dict())
+        self.white = CPU(Color.WHITE)
+        self.black = CPU(Color.BLACK)
+        self.white.opponent, self.black.opponent = self.black, self.white
+        self.game = Game(self.board, (self.white, self.black))
+        self.board.add_piece(King(self.white, (7, 0)))
+        self.board.add_piece(Queen(self.white, (3, 0)))
+        self.board.add_piece(King(self.black, (7, 7)))
+        self.board.add_piece(Rook(self.black, (3, 4)))
+        self.board.add_piece(Pawn(self.black, (4, 5)))
+        self.white.castling.append((False, False))
+        self.black.castling.append((False, False))
+
+    def test_horizon_blunder_without_quiescence(self):
+        self.white.quiescence_depth = 0
+        move = self.white.get_move(self.game, depth=1)
+        self.assertEquals(move.to, (3, 4))
+
+    def test_quiescence_sees_recapture(self):
+        move = self.white.get_move(self.game, depth=1)
+        self.assertNotEquals(move.to, (3, 4))
+
+    def test_node_accounting(self):
+        self.white.get_move(self.game, depth=2)
+        self.assertTrue(self.white.nodes > 0)
+        self.assertTrue(self.white.qnodes > 0)
+
+    def test_pinned_capturer(self):
+        # the knight on e7 could take the queen but for the rook on e1
+        self.game.from_fen("4k3/4n3/8/3Q4/8/8/8/4R1K1 b - - 0 1")
+        board = self.game.board
+        score = self.black._quiesce(self.game, board, self.black,
+                float("-inf"), float("inf"), 4)
+        self.assertEquals(score, self.black._score(board))
+
+
+class ParallelTest(unittest.TestCase):
+    def new_game(self, fen, processes, lazy=False):
+        white = CPU(Color.WHITE, hash_size=1, processes=processes, lazy=lazy)
+        black = CPU(Color.BLACK)
+        white.opponent, black.opponent = black, white
+        game = Game(Board(), (white, black))
+        game.from_fen(fen)
+        white.castling.append((False, False))
+        black.castling.append((False, False))
+        return game
+
+    def assertSameMove(self, fen, depth):
+        serial = self.new_game(fen, 1)
+        parallel = self.new_game(fen, 2)
+        expected = serial.players[0].get_move(serial, depth=depth)
+        got = parallel.players[0].get_move(parallel, depth=depth)
+        self.assertEquals((got.start, got.to), (expected.start, expected.to))
+
+    def test_same_move_as_serial(self):
+        self.assertSameMove("8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - -", 3)
+
+    def test_same_move_as_serial_with_captures(self):
+        self.assertSameMove("4k3/8/3r4/8/3Q4/8/8/4K3 w - -", 2)
+
+    def test_board_restored(self):
+        game = self.new_game("8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - -", 2)
+        key = game.hash
+        game.players[0].get_move(game, depth=2)
+        self.assertEquals(game.hash, key)
+
+    def test_lazy_smp(self):
+        game = self.new_game("8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - -", 3, True)
+        cpu = game.players[0]
+        self.assertTrue(isinstance(cpu.table, SharedTranspositionTable))
+        key = game.hash
+        move = cpu.get_move(game, depth=2)
+        self.assertEquals(cpu.completed_depth, 2)
+        self.assertTrue(game.is_legal(move))
+        self.assertEquals(game.hash, key)
+
+    def test_node_limit(self):
+        game = self.new_game("8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - -", 2)
+        cpu = game.players[0]
+        move = cpu.get_move(game, depth=10, node_limit=200)
+        self.assertTrue(cpu.completed_depth < 10)
+        self.assertTrue(game.is_legal(move))
+
+    def test_stop_reaches_workers(self):
+        game = self.new_game("8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - -", 2)
+        cpu = game.players[0]
+        timer = threading.Timer(0.5, cpu.stop)
+        timer.start()
+        start = time.time()
+        move = cpu.get_move(game, depth=50)
+        timer.join()
+        self.assertTrue(time.time() - start < 2)
+        self.assertTrue(cpu.completed_depth < 50)
+        self.assertTrue(game.is_legal(move))
+
+    def test_one_pool_per_search(self):
+        game = self.new_game("8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - -", 2)
+        pools = []
+        original = parallel.multiprocessing.Pool
+        def pool(*args, **kwargs):
+            pools.append(original(*args, **kwargs))
+            return pools[-1]
+        parallel.multiprocessing.Pool = pool
+        try:
+            game.players[0].get_move(game, depth=3)
+        finally:
+            parallel.multiprocessing.Pool = original
+        self.assertEquals(game.players[0].completed_depth, 3)
+        self.assertEquals(len(pools), 1)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,145 @@
+import multiprocessing
+import unittest
+
+from transposition import TranspositionTable, SharedTranspositionTable, \
+        PerftTable, EXACT, LOWER, UPPER, DEPTH_PREFERRED, ALWAYS_REPLACE, \
+        TWO_TIER
+
+
+class TableTest(unittest.TestCase):
+    TABLE = TranspositionTable
+
+    def setUp(self):
+        self.table = self.TABLE(1)
+
+    def test_size_cap(self):
+        self.assertTrue(len(self.table) * self.table.ENTRY_SIZE <= 1 << 20)
+        self.assertTrue(len(self.table) * self.table.ENTRY_SIZE > 1 << 19)
+
+    def test_miss(self):
+        self.assertEquals(self.table.probe(12345), None)
+
+    def test_hit(self):
+        self.table.store(12345, 3, 7, EXACT, "move")
+        entry = self.table.probe(12345)
+        self.assertEquals((entry.depth, entry.score, entry.bound, entry.move),
+                (3, 7, EXACT, "move"))
+
+    def test_hit_rate(self):
+        self.table.store(1, 1, 0, EXACT)
+        self.table.probe(1)
+        self.table.probe(2)
+        self.assertEquals((self.table.probes, self.table.hits), (2, 1))
+
+    def test_clear(self):
+        self.table.store(12345, 3, 7, EXACT)
+        self.table.clear()
+        self.assertEquals(self.table.probe(12345), None)
+
+
+class SharedTableTest(TableTest):
+    TABLE = SharedTranspositionTable
+
+    def test_hit(self):
+        self.table.store(12345, 3, -7, LOWER, 4321)
+        self.assertEquals(self.table.probe(12345)[1:], (3, -7, LOWER, 4321))
+
+    def test_no_move(self):
+        self.table.store(12345, 3, 7, EXACT)
+        self.assertEquals(self.table.probe(12345).move, None)
+
+    def test_widest_move(self):
+        self.table.store(12345, 3, 7, EXACT, 0xffff)
+        self.assertEquals(self.table.probe(12345).move, 0xffff)
+
+    def test_infinite_scores(self):
+        self.table.store(1, 1, float("inf"), LOWER)
+        self.table.store(2, 1, float("-inf"), UPPER)
+        self.assertEquals(self.table.probe(1).score, float("inf"))
+        self.assertEquals(self.table.probe(2).score, float("-inf"))
+
+    def test_full_width_key(self):
+        key = (1 << 64) - 1
+        self.table.store(key, 2, 0, EXACT)
+        self.assertEquals(self.table.probe(key).depth, 2)
+
+    def test_torn_slot_is_a_miss(self):
+        self.table.store(5, 2, 1, EXACT)
+        index = (5 & self.table._mask) * self.table._slots
+        self.table._words[2 * index] ^= 1 << 32
+        self.assertEquals(self.table.probe(5), None)
+
+    def test_shared_with_child_process(self):
+        child = multiprocessing.Process(target=self.table.store,
+                args=(99, 6, 42, EXACT, 7))
+        child.start()
+        child.join()
+        self.assertEquals(self.table.probe(99).score, 42)
+
+
+class ReplacementTest(unittest.TestCase):
+    TABLE = TranspositionTable
+
+    def collide(self, table, key):
+        """Get a different key that maps to the same bucket."""
+        return key + len(table) // table._slots
+
+    def test_two_tier_keeps_deep_entry(self):
+        table = self.TABLE(1, TWO_TIER)
+        other = self.collide(table, 5)
+        table.store(5, 4, 1, LOWER)
+        table.store(other, 1, 2, UPPER)
+        self.assertEquals(table.probe(5).depth, 4)
+        self.assertEquals(table.probe(other).depth, 1)
+
+    def test_two_tier_always_replaces_second(self):
+        table = self.TABLE(1, TWO_TIER)
+        first = self.collide(table, 5)
+        second = self.collide(table, first)
+        table.store(5, 4, 1, LOWER)
+        table.store(first, 1, 2, UPPER)
+        table.store(second, 1, 3, EXACT)
+        self.assertEquals(table.probe(first), None)
+        self.assertEquals(table.probe(second).score, 3)
+        self.assertEquals(table.probe(5).depth, 4)
+
+    def test_depth_preferred(self):
+        table = self.TABLE(1, DEPTH_PREFERRED)
+        table.store(5, 4, 1, LOWER)
+        table.store(self.collide(table, 5), 1, 2, UPPER)
+        self.assertEquals(table.probe(self.collide(table, 5)), None)
+        self.assertEquals(table.probe(5).depth, 4)
+
+    def test_always_replace(self):
+        table = self.TABLE(1, ALWAYS_REPLACE)
+        table.store(5, 4, 1, LOWER)
+        table.store(self.collide(table, 5), 1, 2, UPPER)
+        self.assertEquals(table.probe(5), None)
+        self.assertEquals(table.probe(self.collide(table, 5)).depth, 1)
+
+    def test_same_position_is_updated(self):
+        table = self.TABLE(1, DEPTH_PREFERRED)
+        table.store(5, 4, 1, LOWER)
+        table.store(5, 2, 3, EXACT)
+        self.assertEquals(table.probe(5).score, 3)
+
+
+class SharedReplacementTest(ReplacementTest):
+    TABLE = SharedTranspositionTable
+
+
+class PerftTableTest(unittest.TestCase):
+    def setUp(self):
+        self.table = PerftTable(1)
+
+    def test_hit(self):
+        self.table.store_count(12345, 3, 8902)
+        self.assertEquals(self.table.probe_count(12345, 3), 8902)
+
+    def test_other_depth_misses(self):
+        self.table.store_count(12345, 3, 8902)
+        self.assertEquals(self.table.probe_count(12345, 2), None)
+
+
+if __name__ == "__main__":
+    unittest.main()
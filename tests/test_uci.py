@@ -0,0 +1,173 @@
+import time
+import unittest
+from StringIO import StringIO
+
+from color import Color
+import uci
+
+MATE_IN_ONE = "7k/8/6K1/8/8/8/8/R7 w - - 0 1"
+
+
+class ParseGoTest(unittest.TestCase):
+    def test_values_and_flags(self):
+        self.assertEquals(uci.parse_go("wtime 1000 btime 2000 ponder".split()),
+                {"wtime": 1000, "btime": 2000, "ponder": True})
+
+    def test_missing_value(self):
+        self.assertRaises(ValueError, uci.parse_go, "wtime 1000 btime".split())
+        self.assertRaises(ValueError, uci.parse_go, "depth x".split())
+
+    def test_movetime(self):
+        self.assertAlmostEquals(uci.time_limit({"movetime": 1000},
+                Color.WHITE), 1 - uci.MARGIN)
+
+    def test_clock(self):
+        limits = {"wtime": 60000, "btime": 3000, "binc": 1000}
+        self.assertAlmostEquals(uci.time_limit(limits, Color.WHITE),
+                60.0 / uci.MOVES_TO_GO)
+        self.assertAlmostEquals(uci.time_limit(limits, Color.BLACK),
+                3.0 / uci.MOVES_TO_GO + 1)
+
+    def test_low_clock(self):
+        self.assertEquals(uci.time_limit({"movetime": 50}, Color.WHITE),
+                uci.MINIMUM_TIME)
+        self.assertEquals(uci.time_limit({"wtime": 40, "btime": 40},
+                Color.BLACK), uci.MINIMUM_TIME)
+
+    def test_no_clock(self):
+        self.assertEquals(uci.time_limit({"depth": 3}, Color.WHITE), None)
+
+
+class UCITest(unittest.TestCase):
+    def setUp(self):
+        self.output = StringIO()
+        self.engine = uci.UCI(output=self.output, hash_size=1)
+
+    def lines(self):
+        return self.output.getvalue().splitlines()
+
+    def bestmove(self):
+        return [line for line in self.lines() if line.startswith("bestmove")]
+
+    def test_handshake(self):
+        self.engine.handle("uci")
+        self.engine.handle("isready")
+        self.assertEquals(self.lines()[-2:], ["uciok", "readyok"])
+
+    def test_position_moves(self):
+        self.engine.handle("position startpos moves e2e4 e7e5 g1f3")
+        self.assertEquals(self.engine.game.to_fen(), "rnbqkbnr/pppp1ppp/8/"
+                "4p3/4P3/5N2/PPPP1PPP/RNBQKB1R b KQkq - 1 2")
+
+    def test_position_fen(self):
+        self.engine.handle("position fen %s moves a1b1" % MATE_IN_ONE)
+        self.assertEquals(self.engine.game.to_fen(),
+                "7k/8/6K1/8/8/8/8/1R6 b - - 1 1")
+
+    def test_illegal_position_move(self):
+        self.engine.handle("position startpos moves e2e5")
+        self.assertTrue(self.lines()[-1].startswith("info string"))
+
+    def test_bad_move_keeps_position(self):
+        self.engine.handle("position fen %s" % MATE_IN_ONE)
+        self.engine.handle("position startpos moves e2e4 e7e5 e1e3")
+        self.assertTrue(self.lines()[-1].startswith("info string"))
+        self.assertEquals(self.engine.game.to_fen(), MATE_IN_ONE)
+
+    def test_bad_fen_keeps_position(self):
+        self.engine.handle("position startpos moves e2e4")
+        fen = self.engine.game.to_fen()
+        self.engine.handle("position fen 8/8/8 w - - 0 1")
+        self.assertTrue(self.lines()[-1].startswith("info string"))
+        self.assertEquals(self.engine.game.to_fen(), fen)
+
+    def test_malformed_commands(self):
+        for line in ("go depth", "go movetime soon",
+                "setoption name Hash value lots",
+                "setoption name Hash value 0"):
+            self.engine.handle(line)
+            self.assertTrue(self.lines()[-1].startswith("info string"))
+        self.assertEquals(self.engine._search, None)
+        self.engine.handle("isready")
+        self.assertEquals(self.lines()[-1], "readyok")
+
+    def test_go_depth(self):
+        self.engine.handle("position fen %s" % MATE_IN_ONE)
+        self.engine.handle("go depth 3")
+        self.engine.finish()
+        self.assertEquals(self.bestmove(), ["bestmove a1a8"])
+
+    def assertAnswersWithin(self, command, seconds):
+        answered = len(self.bestmove())
+        self.engine.handle("position startpos")
+        self.engine.handle(command)
+        self.engine._search.join(seconds)
+        self.assertEquals(len(self.bestmove()), answered + 1)
+        self.engine.stop()
+
+    def test_movetime_below_margin(self):
+        self.assertAnswersWithin("go movetime %d" % (uci.MARGIN * 1000), 1)
+        self.assertAnswersWithin("go movetime 10", 1)
+
+    def test_low_clock(self):
+        self.assertAnswersWithin("go wtime 40 btime 40", 1)
+
+    def test_go_nodes(self):
+        self.engine.handle("position startpos")
+        self.engine.handle("go nodes 200")
+        self.engine.finish()
+        self.assertEquals(len(self.bestmove()), 1)
+        self.assertTrue(self.engine.players[0].nodes +
+                self.engine.players[0].qnodes <= 200)
+
+    def test_stop_infinite(self):
+        self.engine.handle("position startpos")
+        self.engine.handle("go infinite")
+        time.sleep(0.3)
+        self.assertEquals(self.bestmove(), [])
+        start = time.time()
+        self.engine.handle("stop")
+        self.assertTrue(time.time() - start < 0.5)
+        self.assertEquals(len(self.bestmove()), 1)
+
+    def test_infinite_waits_for_stop(self):
+        self.engine.handle("position fen %s" % MATE_IN_ONE)
+        self.engine.handle("go infinite depth 3")
+        time.sleep(0.2)
+        self.assertEquals(self.bestmove(), [])
+        self.engine.handle("stop")
+        self.assertEquals(self.bestmove(), ["bestmove a1a8"])
+
+    def test_ponderhit(self):
+        self.engine.handle("position fen %s" % MATE_IN_ONE)
+        self.engine.handle("go ponder wtime 3000 btime 3000")
+        time.sleep(0.2)
+        self.assertEquals(self.bestmove(), [])
+        self.engine.handle("ponderhit")
+        self.engine.finish()
+        self.assertEquals(self.bestmove(), ["bestmove a1a8"])
+
+    def test_no_moves(self):
+        self.engine.handle("position fen R6k/8/6K1/8/8/8/8/8 b - - 0 1")
+        self.engine.handle("go depth 2")
+        self.engine.finish()
+        self.assertEquals(self.bestmove(), ["bestmove 0000"])
+
+    def test_run(self):
+        # the end of the input waits for the search, unlike quit
+        engine = uci.UCI(StringIO("isready\nposition fen %s\ngo depth 3\n"
+                % MATE_IN_ONE), self.output, 1)
+        self.assertEquals(engine.run(), 0)
+        self.assertEquals(self.lines()[0], "readyok")
+        self.assertEquals(self.bestmove(), ["bestmove a1a8"])
+
+    def test_quit_stops_search(self):
+        engine = uci.UCI(StringIO("go infinite\nquit\nisready\n"),
+                self.output, 1)
+        self.assertEquals(engine.run(), 0)
+        self.assertEquals(len(self.bestmove()), 1)
+        self.assertFalse("readyok" in self.lines())
+
+
+if __name__ == "__main__":
+    unittest.main()
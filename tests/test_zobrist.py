@@ -0,0 +1,152 @@
+import unittest
+
+from bitboard import BitBoard
+from board import Board
+from color import Color
+from move import Move
+from player import Player
+from game import Game
+from piece import King, Knight, Rook, Bishop, Queen, Pawn
+
+
+class ChessTest(unittest.TestCase):
+    def setUp(self):
+        self.board = Board(dict())
+        self.white = Player(Color.WHITE)
+        self.black = Player(Color.BLACK)
+        self.white.opponent, self.black.opponent = self.black, self.white
+        self.game = Game(self.board, (self.white, self.black))
+
+
+class HashTest(ChessTest):
+    def test_empty_boards_match(self):
+        self.assertEquals(Board().hash, BitBoard().hash)
+
+    def test_add_piece_changes_hash(self):
+        self.board.add_piece(King(self.white, (4, 0)))
+        self.assertNotEquals(self.board.hash, 0)
+
+    def test_remove_piece_restores_hash(self):
+        king = King(self.white, (4, 0))
+        self.board.add_piece(king)
+        self.board.remove_piece(king)
+        self.assertEquals(self.board.hash, 0)
+
+    def test_color_matters(self):
+        white, black = Board(), Board()
+        white.add_piece(Knight(self.white, (1, 0)))
+        black.add_piece(Knight(self.black, (1, 0)))
+        self.assertNotEquals(white.hash, black.hash)
+
+    def test_side_to_move(self):
+        self.board.add_piece(King(self.white, (4, 0)))
+        key = self.game.hash
+        self.game.ply += 1
+        self.assertNotEquals(self.game.hash, key)
+
+    def test_castling_rights(self):
+        key = self.game.hash
+        self.white.castling.append((True, False))
+        self.assertNotEquals(self.game.hash, key)
+
+
+class MakeMoveHashTest(ChessTest):
+    def test_undo_restores_hash(self):
+        knight = Knight(self.white, (1, 0))
+        self.board.add_piece(knight)
+        key = self.game.hash
+        self.game._make_move(Move(knight, (1, 0), (2, 2)))
+        self.assertNotEquals(self.game.hash, key)
+        self.game._undo_move()
+        self.assertEquals(self.game.hash, key)
+
+    def test_capture(self):
+        rook = Rook(self.white, (0, 0))
+        bishop = Bishop(self.black, (0, 5))
+        self.board.add_piece(rook)
+        self.board.add_piece(bishop)
+        key = self.game.hash
+        self.game._make_move(Move(rook, (0, 0), (0, 5), bishop))
+        expected = Board()
+        expected.add_piece(Rook(Player(Color.WHITE), (0, 5)))
+        self.assertEquals(self.board.hash, expected.hash)
+        self.game._undo_move()
+        self.assertEquals(self.game.hash, key)
+
+    def test_promotion(self):
+        pawn = Pawn(self.white, (0, 6))
+        self.board.add_piece(pawn)
+        key = self.game.hash
+        self.game._make_move(Move(pawn, (0, 6), (0, 7), None, Queen))
+        expected = Board()
+        expected.add_piece(Queen(Player(Color.WHITE), (0, 7)))
+        self.assertEquals(self.board.hash, expected.hash)
+        self.game._undo_move()
+        self.assertEquals(self.game.hash, key)
+
+    def test_transposition(self):
+        knight1 = Knight(self.white, (1, 0))
+        knight2 = Knight(self.black, (6, 7))
+        self.board.add_piece(knight1)
+        self.board.add_piece(knight2)
+        key = self.game.hash
+        self.game._make_move(Move(knight1, (1, 0), (2, 2)))
+        self.game._make_move(Move(knight2, (6, 7), (5, 5)))
+        self.game._make_move(Move(knight1, (2, 2), (1, 0)))
+        self.game._make_move(Move(knight2, (5, 5), (6, 7)))
+        self.assertEquals(self.game.hash, key)
+
+
+class EnPassantHashTest(ChessTest):
+    def setUp(self):
+        super(EnPassantHashTest, self).setUp()
+        self.pawn = Pawn(self.white, (4, 1))
+        self.knight = Knight(self.black, (6, 7))
+        self.board.add_piece(self.pawn)
+        self.board.add_piece(self.knight)
+
+    def test_double_push_differs_from_single_pushes(self):
+        self.game._make_move(Move(self.pawn, (4, 1), (4, 3)))
+        double = self.game.hash
+        self.game._undo_move()
+        self.game._make_move(Move(self.pawn, (4, 1), (4, 2)))
+        self.game.ply -= 1
+        self.game._make_move(Move(self.pawn, (4, 2), (4, 3)))
+        self.assertNotEquals(self.game.hash, double)
+
+    def test_en_passant_expires(self):
+        self.game._make_move(Move(self.pawn, (4, 1), (4, 3)))
+        self.assertTrue(self.pawn.just_moved)
+        self.game._make_move(Move(self.knight, (6, 7), (5, 5)))
+        self.assertFalse(self.pawn.just_moved)
+
+    def test_undo_restores_en_passant(self):
+        self.game._make_move(Move(self.pawn, (4, 1), (4, 3)))
+        key = self.game.hash
+        self.game._make_move(Move(self.knight, (6, 7), (5, 5)))
+        self.game._undo_move()
+        self.assertTrue(self.pawn.just_moved)
+        self.assertEquals(self.game.hash, key)
+
+
+class PerftHashTest(ChessTest):
+    def setUp(self):
+        super(PerftHashTest, self).setUp()
+        self.game.from_fen(\
+                "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1")
+
+    def test_make_undo_round_trip(self):
+        key = self.game.hash
+        for move in list(self.game.current_player.moves(self.game.board)):
+            self.game._make_move(move)
+            inner = self.game.hash
+            for reply in list(self.game.current_player.moves(self.game.board)):
+                self.game._make_move(reply)
+                self.game._undo_move()
+                self.assertEquals(self.game.hash, inner)
+            self.game._undo_move()
+            self.assertEquals(self.game.hash, key)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,152 @@
+"""Fixed-size tables of search results keyed by position hash."""
+import ctypes
+from collections import namedtuple
+from multiprocessing.sharedctypes import RawArray
+
+from zobrist import DEPTH_KEYS
+
+
+# kinds of score held by an entry
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# replacement policies
+DEPTH_PREFERRED, ALWAYS_REPLACE, TWO_TIER = 0, 1, 2
+
+
+class Entry(namedtuple('Entry', 'key depth score bound move')):
+    """A stored search result.
+    The score is exact, or a lower or upper bound on the true score,
+    depending on how the search that produced it ended. The best move
+    found is kept packed as by move.encode, or is None."""
+
+
+class TranspositionTable(object):
+    """A fixed-size hash table of search results.
+
+    With the TWO_TIER policy every bucket holds two entries: the first
+    is only replaced by a search at least as deep as the one it holds,
+    the second by every search that does not qualify for the first.
+    DEPTH_PREFERRED and ALWAYS_REPLACE use one-entry buckets replaced
+    under the corresponding rule."""
+    # rough cost in bytes of one slot: the list pointer, the entry
+    # tuple and the long holding its key
+    ENTRY_SIZE = 128
+
+    def __init__(self, size=16, policy=TWO_TIER):
+        """Create a table using at most size megabytes."""
+        self.policy = policy
+        self._slots = 2 if policy == TWO_TIER else 1
+        buckets = 1
+        while buckets * 2 * self._slots * self.ENTRY_SIZE <= size << 20:
+            buckets *= 2
+        self._mask = buckets - 1
+        self._size = buckets * self._slots
+        self._allocate()
+        self.probes = self.hits = 0
+
+    def __len__(self):
+        """The number of entries the table can hold."""
+        return self._size
+
+    def _allocate(self):
+        self._entries = [None] * self._size
+
+    def _read(self, index):
+        return self._entries[index]
+
+    def _write(self, index, entry):
+        self._entries[index] = entry
+
+    def clear(self):
+        """Remove every entry."""
+        self._allocate()
+        self.probes = self.hits = 0
+
+    def probe(self, key):
+        """Get the entry stored for a position or None if there is none."""
+        self.probes += 1
+        index = (key & self._mask) * self._slots
+        for i in xrange(index, index + self._slots):
+            entry = self._read(i)
+            if entry is not None and entry.key == key:
+                self.hits += 1
+                return entry
+        return None
+
+    def store(self, key, depth, score, bound, move=None):
+        """Record the result of searching a position to the given depth."""
+        index = (key & self._mask) * self._slots
+        if self.policy != ALWAYS_REPLACE:
+            entry = self._read(index)
+            if entry is not None and entry.key != key and entry.depth > depth:
+                if self.policy == DEPTH_PREFERRED:
+                    return
+                index += 1
+        self._write(index, Entry(key, depth, score, bound, move))
+
+
+class SharedTranspositionTable(TranspositionTable):
+    """A transposition table in memory shared with forked processes.
+
+    Each slot is a pair of 64-bit words: an entry packed into an
+    integer, and that integer XORed with the entry's key. Writers never
+    lock, so two processes storing into a slot at once can leave words
+    from different entries behind. A reader only accepts a slot whose
+    words XOR to the key it is looking for, which turns such a torn
+    slot into a miss."""
+    ENTRY_SIZE = 16
+
+    # layout of a packed entry; scores are stored with an offset and
+    # the top bit marks the slot as used
+    _SCORE_BITS = 32
+    _SCORE_OFFSET = 1 << 31
+    _MOVE_SHIFT = 42
+    _USED = 1 << 63
+
+    def _allocate(self):
+        self._words = RawArray(ctypes.c_uint64, 2 * self._size)
+
+    def clear(self):
+        """Remove every entry."""
+        ctypes.memset(self._words, 0, ctypes.sizeof(self._words))
+        self.probes = self.hits = 0
+
+    def _read(self, index):
+        data = self._words[2 * index]
+        if not data:
+            return None
+        limit = self._SCORE_OFFSET - 1
+        score = (data & 0xffffffff) - self._SCORE_OFFSET
+        if abs(score) == limit:
+            score *= float("inf")
+        move = (data >> self._MOVE_SHIFT) & 0x1ffff
+        return Entry(data ^ self._words[2 * index + 1],
+                (data >> 32) & 0xff, score, (data >> 40) & 0x3,
+                move - 1 if move else None)
+
+    def _write(self, index, entry):
+        limit = self._SCORE_OFFSET - 1
+        score = int(max(-limit, min(limit, entry.score)))
+        move = 0 if entry.move is None else entry.move + 1
+        data = self._USED | score + self._SCORE_OFFSET | entry.depth << 32 \
+                | entry.bound << 40 | move << self._MOVE_SHIFT
+        self._words[2 * index] = data
+        self._words[2 * index + 1] = data ^ entry.key
+
+
+class PerftTable(TranspositionTable):
+    """A table of perft node counts.
+    A count only holds for the depth it was made at, so the depth is
+    mixed into the key it is stored under."""
+    def __init__(self, size=16):
+        """Create a table using at most size megabytes."""
+        super(PerftTable, self).__init__(size, TWO_TIER)
+
+    def probe_count(self, key, depth):
+        """Get the node count stored for a position and depth, or None."""
+        entry = self.probe(key ^ DEPTH_KEYS[depth])
+        return None if entry is None else entry.score
+
+    def store_count(self, key, depth, nodes):
+        """Record the node count of a position to the given depth."""
+        self.store(key ^ DEPTH_KEYS[depth], depth, nodes, EXACT)
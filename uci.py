@@ -0,0 +1,274 @@
+"""UCI front-end, so that a GUI or match runner can drive the engine.
+
+Commands are read on the main thread while the search runs on one of
+its own, so that stop and ponderhit are acted on as soon as they come
+in: stop ends the search at its next node, and bestmove gives the best
+move of the deepest completed iteration. Run this module to start the
+engine:
+
+    python uci.py"""
+import sys
+import threading
+import time
+
+from board import Board
+from color import Color
+from game import Game, new_game
+from move import coordinates
+from move_parser import MoveParser
+from player import CPU
+from transposition import TranspositionTable
+
+NAME = "Chess"
+AUTHOR = "Nick Meyer and Ceasar Bautista"
+START = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+MAX_DEPTH = 64  # plies searched when only time or nodes limit a search
+MOVES_TO_GO = 30  # moves assumed left in the game when not told
+MARGIN = 0.05  # seconds kept back from the clock for each move
+MINIMUM_TIME = 0.01  # seconds given to a move however low the clock
+MAX_HASH = 1024  # largest transposition table, in megabytes
+
+# go arguments followed by a number, and those that stand alone
+GO_VALUES = frozenset(["wtime", "btime", "winc", "binc", "movestogo",
+        "movetime", "nodes", "depth", "mate"])
+GO_FLAGS = frozenset(["infinite", "ponder"])
+
+
+def parse_go(tokens):
+    """Read the arguments of a go command into a dict.
+    Numbers are kept as ints; flags map to True.
+    Raises a ValueError if a number is missing or unreadable."""
+    limits = {}
+    tokens = iter(tokens)
+    for token in tokens:
+        if token in GO_VALUES:
+            value = next(tokens, None)
+            if value is None:
+                raise ValueError("go %s needs a number." % token)
+            limits[token] = int(value)
+        elif token in GO_FLAGS:
+            limits[token] = True
+        elif token == "searchmoves":
+            # not supported; the rest of the line is the moves
+            break
+    return limits
+
+
+def time_limit(limits, color):
+    """Work out the seconds to spend on a move from the go arguments.
+    Returns None if the search is not limited by time."""
+    if "movetime" in limits:
+        return max(limits["movetime"] / 1000.0 - MARGIN, MINIMUM_TIME)
+    left, increment = ("wtime", "winc") if color == Color.WHITE \
+            else ("btime", "binc")
+    if left not in limits:
+        return None
+    left = limits[left] / 1000.0
+    budget = left / limits.get("movestogo", MOVES_TO_GO) + \
+            limits.get(increment, 0) / 1000.0
+    return max(min(budget, left - MARGIN), MINIMUM_TIME)
+
+
+class UCI(object):
+    def __init__(self, input=sys.stdin, output=sys.stdout,
+            hash_size=CPU.HASH_SIZE):
+        self.input = input
+        self.output = output
+        self.players = white, black = \
+                (CPU(Color.WHITE, hash_size), CPU(Color.BLACK, hash_size))
+        white.opponent, black.opponent = black, white
+        self.game = Game(Board(), self.players)
+        self.game.from_fen(START)
+        self.parser = MoveParser()
+        self._lock = threading.Lock()
+        self._search = self._searcher = None
+        # set when a ponder or infinite search may hand in its move
+        self._release = threading.Event()
+        self._pending_time = self._timer = None
+
+    def send(self, line):
+        """Write a line to the GUI."""
+        with self._lock:
+            self.output.write(line + "\n")
+            self.output.flush()
+
+    def run(self):
+        """Answer commands until quit or the end of the input."""
+        while True:
+            line = self.input.readline()
+            if not line or not self.handle(line):
+                break
+        if line:
+            self.stop()
+        else:
+            self.finish()
+        return 0
+
+    def handle(self, line):
+        """Act on one command. Returns False once told to quit.
+        A command that can't be read is answered with an info string
+        and otherwise ignored."""
+        tokens = line.split()
+        if not tokens:
+            return True
+        try:
+            return self._dispatch(tokens[0], tokens[1:])
+        except ValueError as e:
+            self.send("info string %s" % e)
+            return True
+
+    def _dispatch(self, command, arguments):
+        if command == "quit":
+            return False
+        elif command == "uci":
+            self.send("id name %s" % NAME)
+            self.send("id author %s" % AUTHOR)
+            self.send("option name Hash type spin default %d min 1 max %d"
+                    % (CPU.HASH_SIZE, MAX_HASH))
+            self.send("option name Ponder type check default false")
+            self.send("uciok")
+        elif command == "isready":
+            self.send("readyok")
+        elif command == "setoption":
+            self.set_option(arguments)
+        elif command == "ucinewgame":
+            self.finish()
+            for player in self.players:
+                player.table.clear()
+        elif command == "position":
+            self.finish()
+            self.set_position(arguments)
+        elif command == "go":
+            limits = parse_go(arguments)
+            self.finish()
+            self.go(limits)
+        elif command == "stop":
+            self.stop()
+        elif command == "ponderhit":
+            self.ponderhit()
+        return True
+
+    def set_option(self, tokens):
+        """Handle setoption name <name> value <value>.
+        Raises a ValueError if the value doesn't suit the option."""
+        if "value" not in tokens:
+            return
+        split = tokens.index("value")
+        name = " ".join(tokens[1:split]).lower()
+        value = " ".join(tokens[split + 1:])
+        if name == "hash":
+            size = int(value)
+            if not 1 <= size <= MAX_HASH:
+                raise ValueError("Hash must be 1 to %d MB." % MAX_HASH)
+            self.finish()
+            for player in self.players:
+                player.table = TranspositionTable(size)
+
+    def set_position(self, tokens):
+        """Handle position [startpos | fen <fen>] [moves <move> ...].
+        Raises a ValueError, leaving the game as it was, if the FEN or
+        one of the moves can't be read."""
+        moves = []
+        if "moves" in tokens:
+            split = tokens.index("moves")
+            tokens, moves = tokens[:split], tokens[split + 1:]
+        if tokens and tokens[0] == "fen":
+            fen = " ".join(tokens[1:])
+        else:
+            fen = START
+        # the moves are tried out on a game of its own first; the
+        # parser keeps their indices, so replaying them is cheap
+        trial = new_game(Board(), fen)
+        for move in moves:
+            trial._make_move(self.parser.parse(move, trial))
+        game = self.game
+        game.from_fen(fen)
+        for move in moves:
+            game._make_move(self.parser.parse(move, game))
+
+    def go(self, limits):
+        """Start searching the current position in the background."""
+        player = self.game.current_player
+        seconds = time_limit(limits, player.color)
+        waits = limits.get("infinite", False) or limits.get("ponder", False)
+        if "depth" in limits:
+            depth = limits["depth"]
+        elif limits.get("infinite") or seconds is not None or \
+                "nodes" in limits:
+            depth = MAX_DEPTH
+        else:
+            depth = player.depth
+        self._pending_time = None
+        if limits.get("ponder"):
+            # the clock only starts once the guess is confirmed
+            self._pending_time, seconds = seconds, None
+        player.stopped = False
+        self._searcher = player
+        self._release.clear()
+        if not waits:
+            self._release.set()
+        self._search = threading.Thread(target=self._think,
+                args=(player, depth, seconds, limits.get("nodes")))
+        self._search.daemon = True
+        self._search.start()
+
+    def _think(self, player, depth, seconds, nodes):
+        """Search, then report the move once the GUI may have it."""
+        start = time.time()
+        move = player.get_move(self.game, depth, seconds, nodes)
+        elapsed = time.time() - start
+        total = player.nodes + player.qnodes
+        self.send("info depth %d nodes %d time %d nps %d" % (
+                player.completed_depth, total, elapsed * 1000,
+                total / elapsed if elapsed else 0))
+        # a ponder or infinite search holds its move until told
+        self._release.wait()
+        self.send("bestmove %s" % (coordinates(move) if move else "0000"))
+
+    def ponderhit(self):
+        """The move pondered on was played, so the search goes on as a
+        normal one, on the engine's own clock."""
+        if self._search is None:
+            return
+        if self._pending_time is not None:
+            # the search may not have set its own limits yet, so it is
+            # stopped from outside rather than given a deadline
+            self._timer = threading.Timer(self._pending_time,
+                    self._searcher.stop)
+            self._timer.daemon = True
+            self._timer.start()
+            self._pending_time = None
+        self._release.set()
+
+    def finish(self):
+        """Wait for a search that ends by itself to send its bestmove.
+        A ponder or infinite search, which only ends when told, is
+        stopped."""
+        if self._release.is_set() and self._search is not None:
+            self._search.join()
+            self._end_search()
+        else:
+            self.stop()
+
+    def stop(self):
+        """End any running search and wait for its bestmove."""
+        search = self._search
+        if search is None:
+            return
+        self._searcher.stop()
+        self._release.set()
+        search.join()
+        self._end_search()
+
+    def _end_search(self):
+        if self._timer is not None:
+            self._timer.cancel()
+        self._search = self._searcher = self._timer = None
+
+
+def main():
+    return UCI().run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
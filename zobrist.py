@@ -0,0 +1,47 @@
+"""Random keys for Zobrist hashing of positions.
+
+A position's key is the XOR of the keys of every piece on its square,
+the castling rights of both players, the file of a pawn that may be
+taken en passant and, when black is to move, SIDE_KEY. Each term can
+be added or removed with a single XOR, so the key is kept up to date
+as moves are made and undone."""
+import random
+
+from color import Color
+from piece import PIECE_TYPES
+
+# fixed seed so that keys are the same from one run to the next
+_random = random.Random(20120101)
+
+
+def _key():
+    return _random.getrandbits(64)
+
+
+PIECE_KEYS = dict((piece_type, [
+        dict(((x, y), _key()) for x in xrange(8) for y in xrange(8))
+        for color in (Color.WHITE, Color.BLACK)])
+    for piece_type in PIECE_TYPES)
+
+# indexed by color, then queenside and kingside rights
+CASTLING_KEYS = [[[_key(), _key()], [_key(), _key()]]
+        for color in (Color.WHITE, Color.BLACK)]
+
+EN_PASSANT_KEYS = [_key() for x in xrange(8)]
+
+SIDE_KEY = _key()
+
+# not part of a position's key; tables that keep results per depth,
+# like PerftTable, mix these in to tell the depths apart
+DEPTH_KEYS = [_key() for depth in xrange(64)]
+
+
+def piece_key(piece):
+    """Get the key of a piece standing on its current square."""
+    return PIECE_KEYS[type(piece)][piece.color].get(piece._location, 0)
+
+
+def castling_key(player):
+    """Get the key of a player's current castling rights."""
+    queenside, kingside = player.castling[-1]
+    return CASTLING_KEYS[player.color][queenside][kingside]